@@ -1,21 +1,47 @@
-'''Core classes associated with ALPAFA. Defines Head, Category, and Lexicon objects. Lexicons are
-created using a set of heads and a prominence order, and the Lexicon._learn method builds categories
-based on these, following the alogrithm in AAFP. Categories and heads use a ternary d list to define
-their categorial features, which is populated by Lexicon.category_properties. C-selectional features
-are represented as actual Category objects assigned to Head.c_feat and Category.c_feat. Most of the
-heavy algorithmic lifitng is done methods of Lexcion, but Category.assign and Category.divide are
-also fairly key.
+'''Core classes associated with ALPAFA. Defines Head, Category, Grammar and Lexicon objects.
+Lexicons are created using a set of heads and a prominence order (or an immutable Grammar holding
+both, which can be shared by any number of Lexicons), and the Lexicon._learn method builds
+categories based on these, following the alogrithm in AAFP. Categories and heads use a ternary d
+vector to define their categorial features, which is populated by Lexicon.category_properties, and
+is stored as a pair of bitmasks (dspec for specified features and dplus for positive ones).
+C-selectional features are represented as actual Category objects assigned to Head.c_feat and
+Category.c_feat. Most of the heavy algorithmic lifitng is done methods of Lexcion, but
+Category.assign and Category.divide are also fairly key. Sets of heads are represented as integer
+bitmasks, with one bit per head index in Lexicon.heads (see Head.mask and Category.mask), so that
+comparing, intersecting and differencing them are single integer operations.
 '''
 
+import bisect
+import collections
+import io
+from .budget import LIMITS, Monitor
+from .engines import create_engine
+from .formats import write_output
+from .profiling import Profiler
+
 class FeatureBearer():
-    '''Defines some display methods common to Head and Category'''
+    '''Defines some display methods common to Head and Category. Heads and categories are slotted,
+    since lexicons can contain very many categories.
+    '''
+
+    __slots__ = ('dspec', 'dplus', 'feats', 'c_feat', 'category_properties')
 
     def __init__(self):
-        self.d = []
-        self.feats = []
+        self.dspec = 0 # bit i is set iff self is specified for category_properties[i]
+        self.dplus = 0 # bit i is set iff self is positively specified for category_properties[i]
+        self.feats = () # non-categorial features, replaced rather than extended on assignment
         self.c_feat = None
         self.category_properties = [] # properties that are used to define categories
 
+    @property
+    def d(self):
+        '''Ternary list view of self's categorial features, with 2 for +, 1 for -, and 0 for
+        unspecified.
+        '''
+
+        return [(2 if self.dplus >> i & 1 else 1) if self.dspec >> i & 1 else 0
+                for i in range(len(self.category_properties))]
+
     def dstring(self, c_select=False):
         '''Returns a string of self's categorial feature bundle.
 
@@ -25,11 +51,12 @@ class FeatureBearer():
         def catfeats():
             '''Converts d to a readable +/- feature string.'''
 
-            for i, digit in enumerate(self.d):
-                if digit == 2:
-                    yield '+' + self.category_properties[i]
-                elif digit == 1:
-                    yield '-' + self.category_properties[i]
+            spec = self.dspec
+            while spec:
+                low = spec & -spec
+                sign = '+' if self.dplus & low else '-'
+                yield sign + self.category_properties[low.bit_length() - 1]
+                spec ^= low
 
         if c_select:
             return '(' + ','.join(catfeats()) + ')'
@@ -49,16 +76,32 @@ class FeatureBearer():
             return '[' + ','.join(self.feats) + ']'
         return ''
 
+    def _clone(self, container):
+        '''Returns a copy of self belonging to container.'''
+
+        new = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                try:
+                    setattr(new, name, getattr(self, name))
+                except AttributeError: # slot never set
+                    pass
+        new.container = container
+        return new
+
 class Head(FeatureBearer):
     '''Instances of this class correspond to linguistic heads, and recieve their name and properties
     from the input. During the course of the algorithm they are divided into categories, and
     assigned categorial, non-categorial, and c-selectional features.
     '''
 
+    __slots__ = ('name', 'properties', 'mask', 'container')
+
     def __init__(self, name, properties):
         FeatureBearer.__init__(self)
         self.name = name
         self.properties = properties
+        self.mask = 0 # single bit identifying self within its lexicon, set by Lexicon
 
     def __repr__(self):
         return self.name
@@ -85,13 +128,26 @@ class Category(FeatureBearer):
     of which can be assigned non-categorial and c-selectional features (by Category.assign).
     '''
 
-    def __init__(self, container, d, contents):
+    __slots__ = ('container', 'mask', 'order_key', 'parent', 'children')
+
+    def __init__(self, container, dspec, dplus, mask, parent=None):
         FeatureBearer.__init__(self)
         self.container = container # lexicon containing the category
-        self.log = container.log # log of operations carried out by the algorithm
         self.category_properties = container.category_properties # overriding base class
-        self.d = d # overriding base class
-        self.contents = contents
+        self.dspec = dspec # overriding base class
+        self.dplus = dplus # overriding base class
+        self.mask = mask # bitmask of the heads in self
+        self.order_key = None # position in the ranking, set by the lexicon (see Lexicon._rank)
+        self.parent = parent # category self was divided from (None for the category of all heads)
+        self.children = () # categories divided from self
+        if parent is not None:
+            parent.children += (self,)
+
+    @property
+    def contents(self):
+        '''List view of self.mask, built when needed rather than stored.'''
+
+        return self.container.heads_in(self.mask)
 
     def __repr__(self):
         return self.dstring()
@@ -105,15 +161,12 @@ class Category(FeatureBearer):
     def __len__(self):
         '''len(X) returns the number of categorial features that X bears.'''
 
-        return sum(1 for i in self.d if i != 0)
+        return bin(self.dspec).count('1')
 
     def __ge__(self, other):
         '''X >= Y iff Y is a subcategory of X: i.e. Y has a superset of X's categorial features.'''
 
-        for i, j in zip(self.d, other.d):
-            if i != 0 and i != j:
-                return False
-        return True
+        return not (self.dspec & ~other.dspec or (self.dplus ^ other.dplus) & self.dspec)
 
     def lhd(self):
         '''Returns a display string of the values of l, h, and d.'''
@@ -143,45 +196,144 @@ class Category(FeatureBearer):
             self.c_feat = feat
             for head in self:
                 head.c_feat = feat
-            self.log.append('Assign {} to {}'.format(self.c_select(), self.dstring()))
         else:
-            self.feats.append(feat)
+            self.feats += (feat,)
             for head in self:
-                head.feats.append(feat)
-            self.log.append('Assign [{}] to {}'.format(feat, self.dstring()))
+                head.feats += (feat,)
+        self.container._record('assign', self, feat)
 
-    def divide(self, headswithp):
+    def divide(self, headswithp, subcategories=None):
         '''Divide any subcategories of self that have at least one head in headswithp and at least
         one not in headswithp new [+P] and [-P] variants. Returns a list of newly created
-        categories.
+        categories, which are yet to be added to the lexicon.
+
+        Rather than checking every category in the lexicon, this walks down the tree of divisions
+        from the category of all heads (see Category.children). A category's children only contain
+        its own heads, so the walk need not go below any category without heads both in
+        headswithp and in self but not headswithp, as none of its descendants can be divided.
+
+        :param headswithp: bitmask of the heads bearing P
+        :param subcategories: the categories to divide, if already found (by an engine)
         '''
 
         new_cats = []
-        minus_p = {head for head in self.contents if head not in headswithp}
+        minus_p = self.mask & ~headswithp
+        p_bit = 1 << (len(self.category_properties) - 1) # the newest categorial feature
 
         # Extend head features.
-        for head in self.container.heads:
-            if head in headswithp:
-                head.d = head.d[:-1] + [2]
-            elif head in minus_p:
-                head.d = head.d[:-1] + [1]
-
-        for cat in list(self.container):
-            if (self >= cat and
-                    headswithp.intersection(set(cat.contents)) != set() and
-                    set(cat.contents) - headswithp != set()):
-            # i.e. cat is a subcat of self, and contains all heads with p and at least one head
-            # without p
-                cat_ps = [head for head in cat if head in headswithp]
-                cat_others = [head for head in cat if head in minus_p]
-                cat_plus_p = Category(self.container, cat.d[:-1] + [2], cat_ps)
-                cat_minus_p = Category(self.container, cat.d[:-1] + [1], cat_others)
-                self.container.categories.extend([cat_plus_p, cat_minus_p])
-                new_cats.extend(self.container.categories[-2:])
-        self.log.append('Divide {} into [{}]'
-                        .format(self.dstring(), self.category_properties[-1]))
+        for head in self:
+            head.dspec |= p_bit
+            if head.mask & headswithp:
+                head.dplus |= p_bit
+
+        if subcategories is None:
+            subcategories = []
+            stack = [self.container.categories[0]]
+            while stack:
+                cat = stack.pop()
+                if not (cat.mask & headswithp and cat.mask & minus_p):
+                    continue
+                stack.extend(cat.children)
+                if self >= cat:
+                # i.e. cat is a subcat of self, and contains at least one head with p and at least
+                # one head without p
+                    subcategories.append(cat)
+
+        for cat in subcategories:
+            cat_plus_p = Category(self.container, cat.dspec | p_bit, cat.dplus | p_bit,
+                                  cat.mask & headswithp, cat)
+            cat_minus_p = Category(self.container, cat.dspec | p_bit, cat.dplus,
+                                   cat.mask & minus_p, cat)
+            new_cats.extend([cat_plus_p, cat_minus_p])
+        self.container._record('divide', self, self.category_properties[-1])
         return new_cats
 
+class LogEvent(collections.namedtuple('LogEvent', ['op', 'category', 'feature'])):
+    '''A record of an operation carried out by the algorithm: op is 'assign' or 'divide', category
+    the category it applied to, and feature the dependent feature assigned (a str, or a Category
+    for c-selectional features) or the name of the new categorial feature. Events are only
+    rendered as text by str().
+    '''
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.op == 'divide':
+            return 'Divide {} into [{}]'.format(self.category.dstring(), self.feature)
+        if isinstance(self.feature, Category):
+            return 'Assign {} to {}'.format(self.feature.dstring(c_select=True),
+                                            self.category.dstring())
+        return 'Assign [{}] to {}'.format(self.feature, self.category.dstring())
+
+class HeadSpec(collections.namedtuple('HeadSpec', ['name', 'properties'])):
+    '''The name and frozenset of properties of a head in a Grammar.'''
+
+    __slots__ = ()
+
+class Grammar():
+    '''An immutable parsed input: a prominence order, the name and properties of each head, and an
+    index of which heads bear each property. A Grammar is never modified by the Lexicons created
+    from it (each of which makes its own Head objects and prominence list), so a single parse can
+    be shared by any number of runs, including in forked worker processes.
+    '''
+
+    __slots__ = ('prominence', 'heads', '_property_index')
+
+    def __init__(self, prominence, heads):
+        ''':param prominence: a prominence order
+           :param heads: Head or HeadSpec objects (only their names and properties are used)
+        '''
+
+        heads = tuple(HeadSpec(head.name, frozenset(head.properties)) for head in heads)
+        index = {} # property -> bitmask of heads bearing it
+        for i, head in enumerate(heads):
+            for prop in head.properties:
+                index[prop] = index.get(prop, 0) | 1 << i
+        object.__setattr__(self, 'prominence', tuple(prominence))
+        object.__setattr__(self, 'heads', heads)
+        object.__setattr__(self, '_property_index', index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Grammar objects are immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Grammar objects are immutable')
+
+    def __reduce__(self):
+        return (type(self), (self.prominence, self.heads))
+
+    def with_prominence(self, prominence):
+        '''Returns a Grammar with the same heads as self and a different prominence order, sharing
+        self's property index.
+        '''
+
+        new = object.__new__(type(self))
+        object.__setattr__(new, 'prominence', tuple(prominence))
+        object.__setattr__(new, 'heads', self.heads)
+        object.__setattr__(new, '_property_index', self._property_index)
+        return new
+
+    def __eq__(self, other):
+        if not isinstance(other, Grammar):
+            return NotImplemented
+        return self.prominence == other.prominence and self.heads == other.heads
+
+    def __hash__(self):
+        return hash((self.prominence, self.heads))
+
+    def __repr__(self):
+        return 'Grammar({} heads, prominence = {})'.format(len(self.heads),
+                                                            ', '.join(self.prominence))
+
+class Checkpoint():
+    '''A snapshot of a Lexicon's learning state, taken by Lexicon.checkpoint and applied by
+    Lexicon.restore. The snapshot is never modified, so it can be restored any number of times.
+    '''
+
+    def __init__(self, state):
+        self.state = state # copied values of the attributes in Lexicon.STATE
+        self.position = state['_position'] # number of prominence entries processed
+
 class Lexicon():
     '''Defines a "container" for all the Heads, which are then divided up into categories by the
     assignment of features to these heads via a specified prominence order. Lexicon._learn starts
@@ -190,52 +342,199 @@ class Lexicon():
     largely for display purposes.
     '''
 
-    def __init__(self, prominence, heads, uf_choice=True, c_select_choice=True):
-        ''':param uf_choice: implement unvalued features
+    # attributes making up the learning state saved by Lexicon.checkpoint
+    STATE = ('prominence', 'initial_prominence', 'heads', 'categories', '_order_keys',
+             '_key_width', '_extensions', 'category_properties', 'log', 'operations',
+             '_invis_index', '_position', 'acquired', 'stopped', '_trace')
+
+    _profiler = None # Profiler timing each phase of the algorithm, if profile_choice was given
+    _trace = None # result of self.headswith at each position processed, if incremental_choice
+    _checkpoints = None # Checkpoints at each position in the initial prominence order, likewise
+    _engine = None # engine replacing the loops over categories, if not the reference engine
+    _monitor = None # Monitor checking the budget and reporting progress, if either was given
+    stopped = None # name of the budget limit (see budget.LIMITS) that stopped learning, if any
+
+
+    def __init__(self, prominence, heads=None, uf_choice=True, c_select_choice=True,
+                 log_choice=True, learn=True, profile_choice=False, incremental_choice=False,
+                 engine='python', budget=None, progress=None):
+        ''':param prominence: a prominence order, or a Grammar (in which case heads must be None)
+           :param heads: Head objects, whose properties are read but never modified
+           :param uf_choice: implement unvalued features
            :param c_select_choice: implement c-selection
+           :param log_choice: keep a log of operations (otherwise only count them)
+           :param learn: run the algorithm immediately (otherwise call self.resume)
+           :param profile_choice: time each phase of the algorithm (see self.profile)
+           :param incremental_choice: keep what is needed to update self with an edited grammar
+                                      without starting again (see self.update)
+           :param engine: implementation of the loops over categories, one of engines.ENGINES
+                          (all give identical results)
+           :param budget: a budget.Budget limiting learning, which stops early (see self.status)
+                          if any limit is reached
+           :param progress: function called with a progress report every second while learning
+                            (see budget.Monitor.report, and budget.print_progress)
         '''
 
         # parameters
         self.uf_choice = uf_choice
         self.c_select_choice = c_select_choice
+        self.log_choice = log_choice
+        self.incremental_choice = incremental_choice
+        self.engine = engine
+        self._engine = create_engine(engine)
+        if budget is not None or progress is not None:
+            self._monitor = Monitor(budget, progress)
+        if profile_choice:
+            self._profiler = Profiler()
+            self._profiler.attach(self)
+
+        if isinstance(prominence, Grammar):
+            if heads is not None:
+                raise TypeError('heads must not be given with a Grammar')
+            self._start(prominence)
+        else:
+            self._start(Grammar(prominence, heads))
 
-        # core setup
-        self.prominence = prominence
-        self.heads = heads
-        self.initial_prominence = list(prominence)
+        if learn:
+            self._learn()
+
+    def _start(self, grammar):
+        '''Sets up the initial learning state for grammar: a single category of all heads, none of
+        which bear any features, with no prominence entries yet processed.
+        '''
+
+        self.grammar = grammar
+        self.prominence = list(self.grammar.prominence)
+        self.heads = [Head(head.name, head.properties) for head in self.grammar.heads]
+        self.initial_prominence = list(self.grammar.prominence)
         self._invis_index = None # position of the special "invis" cateorial feature
+        self._position = 0 # number of prominence entries processed so far
+        self.acquired = False
+        self.stopped = None
         self.category_properties = [] # properties that are used to define categories
-        self.log = []  # log of operations carried out by the algorithm
-        self.categories = [Category(self, [], self.heads)]
-        for head in self.heads:
+        self.log = [] if self.log_choice else None # LogEvents for the operations carried out
+        self.operations = 0 # number of operations carried out by the algorithm
+        if self.incremental_choice:
+            self._trace = []
+            self._checkpoints = []
+        for i, head in enumerate(self.heads): # in the same order as self.grammar.heads
             head.container = self
             head.category_properties = self.category_properties
+            head.mask = 1 << i
+        self.categories = [] # kept in rank order, highest first
+        self._order_keys = [] # Category.order_key of each item in self.categories
+        self._key_width = 8 # digits of d in each order key (see self._rank)
+        self._extensions = {} # bitmask -> highest ranked category with exactly those heads
+        root = Category(self, 0, 0, (1 << len(self.heads)) - 1)
+        root.order_key = self._rank(root)
+        self._add_category(root)
+        self._property_index = self.grammar._property_index # property -> bitmask of heads
         if self.c_select_choice:
             self.prominence.append(self.categories[0])
 
-        self._learn()
-
     def __iter__(self):
         return iter(self.categories)
 
     def __repr__(self):
         return '\n'.join(cat.spec() for cat in self)
 
-    def headswith(self, p):
-        '''Helper function for the main algorithm. Returns a set of the heads bearing the current
-        property p, and a bool stating whether or not that property triggers movement.
+    def heads_in(self, mask):
+        '''Returns a list of the heads in a bitmask, in the order they appear in self.heads.'''
+
+        heads = []
+        while mask:
+            low = mask & -mask
+            heads.append(self.heads[low.bit_length() - 1])
+            mask ^= low
+        return heads
+
+    def _rank(self, cat):
+        '''Returns the order key by which cat is ranked, lowest first: categories with fewer
+        categorial features, then more heads, then lexicographically higher d vectors rank higher.
+
+        The key is a single int, holding the number of features and heads above the digits of d,
+        each mapped from x to 2 - x and followed by a 3, which stands in for the unspecified (0)
+        values of any features added after cat was created. Every category is specified for the
+        newest feature when it is created, so these digits stop at the highest bit of cat.dspec,
+        and compare exactly as the full d vectors would once aligned to the left of
+        self._key_width digits.
         '''
 
+        length = cat.dspec.bit_length()
+        digits = 3
+        if length:
+            width = '0{}b'.format(length)
+            unspecified = ~cat.dspec & ((1 << length) - 1)
+            minus = cat.dspec & ~cat.dplus
+            # binary digits read in base 4 spread each feature over two bits, first feature highest
+            digits = (2 * int(format(unspecified, width)[::-1], 4) +
+                      int(format(minus, width)[::-1], 4)) << 2 | 3
+        size = len(self.heads)
+        return ((len(cat) * (size + 1) + size - bin(cat.mask).count('1')) << 2 * self._key_width |
+                digits << 2 * (self._key_width - length - 1))
+
+    def _widen_keys(self, length):
+        '''Makes room in order keys for the digits of categories specified for length features,
+        rewriting the keys of every existing category if there was not enough (which keeps their
+        order, and so happens rarely, as the room is doubled).
+        '''
+
+        if length < self._key_width:
+            return
+        while length >= self._key_width:
+            self._key_width *= 2
+        for cat in self.categories:
+            cat.order_key = self._rank(cat)
+        self._order_keys = [cat.order_key for cat in self.categories]
+
+    def _add_category(self, cat):
+        '''Inserts cat, whose order key has been set, into self.categories at its rank, and records
+        it in self._extensions if it outranks any existing category with the same heads. Every
+        category's rank relative to the others is fixed when it is created (features added later
+        are unspecified for all existing categories), so existing categories never need to be
+        reordered or reindexed.
+        '''
+
+        i = bisect.bisect(self._order_keys, cat.order_key)
+        self._order_keys.insert(i, cat.order_key)
+        self.categories.insert(i, cat)
+        current = self._extensions.get(cat.mask)
+        if current is None or cat.order_key < current.order_key:
+            self._extensions[cat.mask] = cat
+        if self._engine is not None:
+            self._engine.add(self, cat)
+
+    def _record(self, op, category, feature):
+        '''Counts an operation carried out by the algorithm, and logs it if required.'''
+
+        self.operations += 1
+        if self.log is not None:
+            self.log.append(LogEvent(op, category, feature))
+
+    def headswith(self, p, index=None):
+        '''Helper function for the main algorithm. Returns a bitmask of the heads bearing the
+        current property p, and a bool stating whether or not that property triggers movement.
+
+        :param index: property index to look p up in (self._property_index if None)
+        '''
+
+        if index is None:
+            index = self._property_index
         move = False
         if isinstance(p, Category):
-            headswithp = {head for head in self.heads if
-                          set([h.name for h in p.contents]) in head.properties}
-            return headswithp, move
+            if self._engine is not None and index is self._property_index:
+                selecting = self._engine.selecting(self, p)
+                if selecting is not None:
+                    return selecting, move
+            names = frozenset(h.name for h in p.contents)
+            return index.get(names, 0), move
+        elif isinstance(p, str):
+            headswithp = index.get(p, 0)
         else:
-            headswithp = {head for head in self.heads if p in head.properties}
-        if headswithp == set():
+            headswithp = index.get(frozenset(p), 0)
+        if headswithp == 0:
         # no singleton sets, so must be a movement feature
-            headswithp = {head for head in self.heads if (list(p)[0], 'm') in head.properties}
+            headswithp = index.get((list(p)[0], 'm'), 0)
             move = True
 
         return headswithp, move
@@ -244,31 +543,227 @@ class Lexicon():
 # Main body of the algorithm, annotated with the step numbers from (103) of AAFP chapter 1:
 #---------------------------------------------------------------------------------------------------
 
-    def _learn(self):
+    def _learn(self, stop=None):
         '''Loops over the prominence order, first attempting to assign p as a dependent feature of
         the "largest" possible category, and if this fails, dividing the "smallest" possible
         category (and its relevant subcategories) into +P and -P variants.
+
+        :param stop: number of prominence entries after which to pause (run to the end if None)
         '''
 
+        if self._monitor is not None:
+            self._monitor.start()
         # (i, xv) identify next undescribed property p
-        for p in self.prominence:
-            non_cat = False
+        while self._position < len(self.prominence):
+            if stop is not None and self._position >= stop:
+                return
+            if self._monitor is not None:
+                self.stopped = self._monitor.check(self)
+                if self.stopped is not None:
+                    return
+            if self._checkpoints is not None:
+                self._save_checkpoint()
+            p = self.prominence[self._position]
+            self._position += 1
             headswithp, move = self.headswith(p)
+            if self._trace is not None:
+                self._trace.append((headswithp, move))
 
             # (ii) search for "largest" category coextensive with p
-            for cat in self:
-                if set(cat.contents) == headswithp:
-                    non_cat = True
-                    # go to (iii)
-                    self._add_dependent_feature(p, cat, move)
-                    break
-
-            if non_cat is False and isinstance(p, str) and headswithp != set():
+            cat = self._coextensive(headswithp)
+            if cat is not None:
+                # go to (iii)
+                self._add_dependent_feature(p, cat, move)
+
+            elif isinstance(p, str) and headswithp != 0:
             # (x) is p a bare property?
                 # go to (xi)
                 self._divide_categories(p, headswithp)
 
+        if self._checkpoints is not None:
+            self._save_checkpoint()
         self.acquired = True
+        self.stopped = None
+
+    def _coextensive(self, headswithp):
+        '''Returns the highest ranked category containing exactly the heads in the bitmask
+        headswithp, or None if there isn't one.
+        '''
+
+        return self._extensions.get(headswithp)
+
+#---------------------------------------------------------------------------------------------------
+
+    def resume(self, stop=None):
+        '''Continues the algorithm from the current position in the prominence order.
+
+        :param stop: number of prominence entries after which to pause (run to the end if None)
+        '''
+
+        self._learn(stop)
+
+    def _copy_state(self, state):
+        '''Returns a copy of state (a dict of the attributes in self.STATE) belonging to self.
+        Heads, categories, and the lists they share are copied, and all references between them
+        redirected to the copies, while immutable values are shared.
+        '''
+
+        new = dict(state)
+        new['category_properties'] = category_properties = list(state['category_properties'])
+        heads = {}
+        for head in state['heads']:
+            heads[head] = head._clone(self)
+            heads[head].category_properties = category_properties
+        cats = {}
+        for cat in state['categories']:
+            cats[cat] = cat._clone(self)
+            cats[cat].category_properties = category_properties
+        for cat, clone in cats.items():
+            clone.parent = cats[cat.parent] if cat.parent is not None else None
+            clone.children = tuple(cats[child] for child in cat.children)
+        for bearer in list(heads.values()) + list(cats.values()):
+            if bearer.c_feat is not None:
+                bearer.c_feat = cats[bearer.c_feat]
+        new['heads'] = list(heads.values())
+        new['categories'] = [cats[cat] for cat in state['categories']]
+        new['_order_keys'] = list(state['_order_keys'])
+        new['_extensions'] = {mask: cats[cat] for mask, cat in state['_extensions'].items()}
+        new['prominence'] = [cats[p] if isinstance(p, Category) else p
+                             for p in state['prominence']]
+        new['initial_prominence'] = list(state['initial_prominence'])
+        if state['_trace'] is not None:
+            new['_trace'] = list(state['_trace'])
+        if state['log'] is not None:
+            new['log'] = [LogEvent(op, cats[cat], cats.get(feat, feat) if op == 'assign' else feat)
+                          for op, cat, feat in state['log']]
+        return new
+
+    def checkpoint(self):
+        '''Returns a Checkpoint of the current learning state: the processed and appended
+        prominence entries, categories, heads' features, and log.
+        '''
+
+        state = {name: getattr(self, name) for name in self.STATE}
+        return Checkpoint(self._copy_state(state))
+
+    def restore(self, checkpoint, prominence=None):
+        '''Returns self to the learning state saved in checkpoint, which must have been taken
+        from a lexicon over the same heads with the same options.
+
+        :param prominence: a new initial prominence order to continue with, which must agree with
+                           the checkpoint's on every entry processed so far
+        '''
+
+        state = self._copy_state(checkpoint.state)
+        if prominence is not None:
+            initial = state['initial_prominence']
+            if (len(prominence) != len(initial) or
+                    list(prominence[:checkpoint.position]) != initial[:checkpoint.position]):
+                raise ValueError('prominence order does not extend the checkpoint')
+            state['prominence'][:len(initial)] = prominence
+            state['initial_prominence'] = list(prominence)
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self._checkpoints is not None: # later checkpoints no longer describe self's past
+            del self._checkpoints[checkpoint.position + 1:]
+
+    def copy(self):
+        '''Returns an independent copy of self, including its learning state.'''
+
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        state = {name: getattr(self, name) for name in self.STATE}
+        for name, value in new._copy_state(state).items():
+            setattr(new, name, value)
+        if self._engine is not None: # the copy's engine describes its own categories
+            new._engine = create_engine(self.engine)
+        if self._profiler is not None: # the copy profiles its own calls from here on
+            new._profiler = Profiler()
+            new._profiler.attach(new)
+        if self._checkpoints is not None:
+            new._checkpoints = list(self._checkpoints) # checkpoints are never modified
+        return new
+
+    def _save_checkpoint(self):
+        '''Adds a Checkpoint of the current state to self._checkpoints, if the current position is
+        within the initial prominence order and has not already been checkpointed.
+        '''
+
+        if len(self._checkpoints) == self._position <= len(self.initial_prominence):
+            self._checkpoints.append(self.checkpoint())
+
+    def _earliest_change(self, grammar):
+        '''Returns the first position in the prominence order at which learning from grammar would
+        differ from what self has learned so far, or None if it wouldn't. grammar must have the
+        same heads as self.grammar, in the same order, though their properties may differ.
+
+        Every step before the first whose prominence entry differs, or whose entry picks out a
+        different set of heads in grammar, proceeds exactly as before, so the learning state at
+        that position is unaffected.
+        '''
+
+        old, new = self.initial_prominence, grammar.prominence
+        first = next((i for i, (a, b) in enumerate(zip(old, new)) if a != b), None)
+        if first is None and len(old) != len(new):
+            first = min(len(old), len(new))
+        index = grammar._property_index
+        if index is not self._property_index:
+            for i, traced in enumerate(self._trace[:first]):
+                if self.headswith(self.prominence[i], index) != traced:
+                    return i
+        return first
+
+    def update(self, grammar):
+        '''Brings self up to date with grammar, an edited version of self.grammar, and learns to the
+        end of its prominence order. The result is identical to a new Lexicon learned from grammar
+        with the same options, but learning is only replayed from the checkpoint nearest before the
+        first step affected by the edit. Changes to heads' properties and to the prominence order
+        only replay from the first step they affect, but adding, removing or reordering heads
+        changes the category of all heads, and so replays from the start.
+
+        Only available if self was created with incremental_choice.
+        '''
+
+        if self._checkpoints is None:
+            raise ValueError('this lexicon was not created with incremental_choice')
+        if [head.name for head in grammar.heads] != [head.name for head in self.grammar.heads]:
+            self._start(grammar)
+        else:
+            step = self._earliest_change(grammar)
+            if step is not None:
+                checkpoint = self._checkpoints[min(step, len(self._checkpoints) - 1)]
+                self.restore(checkpoint)
+                self.prominence[:len(self.initial_prominence)] = grammar.prominence
+                self.initial_prominence = list(grammar.prominence)
+                self.acquired = False
+            self.grammar = grammar
+            self._property_index = grammar._property_index
+            for head, spec in zip(self.heads, grammar.heads):
+                head.properties = spec.properties
+        self._learn()
+
+    def extend(self, entries):
+        '''Appends entries to the end of the initial prominence order, and continues learning, as
+        if they had been there from the start (see self.update).
+        '''
+
+        self.update(self.grammar.with_prominence(self.grammar.prominence + tuple(entries)))
+
+    def profile(self):
+        '''Returns a dict of the calls and time spent in each phase of the algorithm, and of the
+        number of prominence entries in the initial order and appended while learning ({p} sets
+        and categories). Only available if self was created with profile_choice.
+        '''
+
+        if self._profiler is None:
+            raise ValueError('this lexicon was not profiled')
+        initial = len(self.initial_prominence)
+        appended = self.prominence[initial:]
+        categories = sum(1 for p in appended if isinstance(p, Category))
+        return {'phases': self._profiler.phases(),
+                'prominence': {'initial': initial,
+                               'sets': len(appended) - categories,
+                               'categories': categories}}
 
     def _add_dependent_feature(self, prop, category, move):
         '''Adds the appropriate dependent feature, depending on the nature of prop. Equivalent to
@@ -307,45 +802,130 @@ class Lexicon():
         if prop == 'invis':
             self._invis_index = len(self.category_properties)
 
-        # add new categorial feature to lexicon
+        # add new categorial feature to lexicon (unspecified for every existing head and category)
         self.category_properties.append(prop.upper())
-        for cat in self:
-            cat.d = cat.d + [0]
-        for head in self.heads:
-            head.d = head.d + [0]
 
         # (xi) search for "smallest" category
-        for category in reversed(self.categories):
-            if headswithprop < set(category.contents):
-                # (xii, xiii) assign categorial features to the appropriate heads and categories
-                new_cats = category.divide(headswithprop)
-                break
+        category = self._smallest(headswithprop)
+        # (xii, xiii) assign categorial features to the appropriate heads and categories
+        new_cats = self._divide(category, headswithprop)
 
         # (xiv) reorder categories and append new visible categories to prominence
-        self.categories.sort(key=lambda k: (-len(k), len(k.contents), k.d), reverse=True)
+        self._rerank(new_cats)
         if self.c_select_choice:
             if self._invis_index is not None:
-                new_cats = [cat for cat in new_cats if cat.d[self._invis_index] != 2]
-            self.prominence.extend([cat for cat in self if cat in new_cats])
+                new_cats = [cat for cat in new_cats if not cat.dplus >> self._invis_index & 1]
+            self.prominence.extend(new_cats)
+
+    def _smallest(self, headswithprop):
+        '''Returns the lowest ranked category containing all the heads in the bitmask headswithprop
+        and at least one other. There always is one, as headswithprop is not coextensive with any
+        category, including the category of all heads.
+        '''
+
+        if self._engine is not None:
+            return self._engine.smallest(self, headswithprop)
+        for category in reversed(self.categories):
+            if (headswithprop != category.mask and
+                    headswithprop & category.mask == headswithprop):
+                return category
+
+    def _divide(self, category, headswithprop):
+        '''Divides category and its relevant subcategories by the heads in headswithprop, returning
+        the new categories (see Category.divide).
+        '''
+
+        if self._engine is not None:
+            return self._engine.divide(self, category, headswithprop)
+        return category.divide(headswithprop)
+
+    def _rerank(self, new_cats):
+        '''Adds new_cats to self.categories at their ranks, sorting them first.'''
+
+        if not new_cats:
+            return
+        self._widen_keys(max(cat.dspec.bit_length() for cat in new_cats))
+        for cat in new_cats:
+            cat.order_key = self._rank(cat)
+        new_cats.sort(key=lambda cat: cat.order_key)
+        for cat in new_cats:
+            self._add_category(cat)
 
 #---------------------------------------------------------------------------------------------------
 
     def display(self, divlog_choice=True, cats_choice=True, cats_dep_choice=False):
         '''Takes a number of optional parameters, and returns a tabbed specification of the lexicon.
 
-        :param divlog_choice: display self.log
+        :param divlog_choice: display self.log (which must have been kept)
+        :param cats_choice: display categories
+        :param cats_dep_choice: display dependent features below categories
+        '''
+
+        output = io.StringIO()
+        self.write(output, divlog_choice, cats_choice, cats_dep_choice)
+        return output.getvalue()
+
+    def render(self, f, output_format='text', divlog_choice=False, cats_choice=False,
+               cats_dep_choice=False):
+        '''Writes the lexicon to the file object f in one of formats.FORMATS (see
+        formats.write_output). This is the display phase when profiling, whatever the format.
+        '''
+
+        write_output(self, f, output_format, divlog_choice, cats_choice, cats_dep_choice)
+
+    def write(self, f, divlog_choice=True, cats_choice=True, cats_dep_choice=False):
+        '''Writes the tabbed specification returned by self.display to the file object f, a line
+        at a time, without building the whole specification in memory.
+
+        :param divlog_choice: display self.log (which must have been kept)
         :param cats_choice: display categories
         :param cats_dep_choice: display dependent features below categories
         '''
 
-        output = ''
+        def write_lines(lines):
+            '''Writes lines to f, separated by newlines.'''
+
+            for i, line in enumerate(lines):
+                if i:
+                    f.write('\n')
+                f.write(line)
+
         if divlog_choice:
-            output += '\n'.join(self.log) + '\n\n'
+            if self.log is None:
+                raise ValueError('no log was kept for this lexicon')
+            write_lines(str(event) for event in self.log)
+            f.write('\n\n')
         if cats_choice:
-            output += '\n'.join(cat.spec(cats_dep_choice=cats_dep_choice) for cat in self) + '\n\n'
-        output += '\n'.join(head.spec(self.c_select_choice) for head in self.heads)
-        output += '\n\n' + self.stats()
-        return output
+            write_lines(cat.spec(cats_dep_choice=cats_dep_choice) for cat in self)
+            f.write('\n\n')
+        write_lines(head.spec(self.c_select_choice) for head in self.heads)
+        f.write('\n\n' + self.stats())
+
+    def status(self):
+        '''Returns 'complete' if learning has finished, the name of the budget limit that stopped
+        it early (see budget.LIMITS), or 'paused' if it was paused (see self.resume).
+        '''
+
+        if self.acquired:
+            return 'complete'
+        if self.stopped is not None:
+            return self.stopped
+        return 'paused'
+
+    def counts(self):
+        '''Returns a dict of the figures describing the algorithm's behaviour that are reported by
+        self.stats, for machine-readable output. Loops are those carried out so far, and queued
+        gives the number of prominence entries still to be looped over if learning is stopped or
+        paused (0 once it is complete).
+        '''
+
+        return {'status': self.status(),
+                'loops': self._position,
+                'queued': len(self.prominence) - self._position,
+                'non_vacuous': self.operations,
+                'categories': len(self.categories),
+                'categorial_features': len(self.category_properties),
+                'non_categorial_features': self.operations - len(self.category_properties)}
 
     def stats(self):
         '''Returns a string containing some information on the algorithm's behaviour.'''
@@ -369,11 +949,12 @@ class Lexicon():
                     agree += ['s']
             return tuple(agree)
 
-        loops = agree(len(self.prominence))
-        nonvacs = len(self.log)
-        cats = agree(len(self.categories), y=True)
-        catfeats = agree(len(self.category_properties))
-        noncatfeats = agree(len(self.log) - len(self.category_properties))
+        counts = self.counts()
+        loops = agree(counts['loops'])
+        nonvacs = counts['non_vacuous']
+        cats = agree(counts['categories'], y=True)
+        catfeats = agree(counts['categorial_features'])
+        noncatfeats = agree(counts['non_categorial_features'])
         stats = 'Over {} loop{}, '.format(*loops)
         if loops == 1:
             stats += 'which was non-vacuous, '
@@ -384,4 +965,9 @@ class Lexicon():
         stats += 'ALPAFA created {} categor{} '.format(*cats)
         stats += 'using {} pair{} of categorial features, '.format(*catfeats)
         stats += 'and assigned {} non-categorial feature{}.'.format(*noncatfeats)
+        if self.stopped is not None:
+            limit = LIMITS[self.stopped].format(getattr(self._monitor.budget, self.stopped))
+            queued = agree(counts['queued'], y=True)
+            stats += (' Learning stopped early on reaching {}, with {} prominence entr{} still '
+                      'queued.'.format(limit, *queued))
         return stats
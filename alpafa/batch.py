@@ -0,0 +1,168 @@
+'''Runs ALPAFA over many input files and option combinations in a single invocation, spreading the
+jobs over a pool of worker processes. Each job writes its own output file, and a JSONL summary line
+recording its options, statistics, fingerprint (see compare.py) and wall time. Each input is parsed
+once per worker process into a Grammar, which is shared by all of that worker's jobs on the input.
+'''
+
+import collections
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
+import time
+from .alpafa import Grammar
+from .cache import ResultCache, cached_lexicon
+from .compare import fingerprint
+from .compiled import load_input
+from .formats import write_output
+from .parse import ParserError
+
+def expand_inputs(inputs):
+    '''Returns a list of input files, replacing any directories in inputs with the .txt files and
+    compiled .alpc lexicons they contain.
+    '''
+
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(('.txt', '.alpc')) and
+                         os.path.isfile(os.path.join(path, name)))
+        else:
+            files.append(path)
+    return files
+
+def output_stems(input_files):
+    '''Returns the stem of the output file names for each input file: its name without its
+    extension, or with it if another input shares the stem, or failing that, numbered by its
+    position among the inputs that share it (as when the same name is in two directories).
+    '''
+
+    stems = [os.path.splitext(os.path.basename(f))[0] for f in input_files]
+    counts = collections.Counter(stems)
+    stems = [os.path.basename(f) if counts[stem] > 1 else stem
+             for f, stem in zip(input_files, stems)]
+    counts = collections.Counter(stems)
+    seen = collections.Counter()
+    numbered = []
+    for stem in stems:
+        if counts[stem] > 1:
+            seen[stem] += 1
+            stem = '{}.{}'.format(stem, seen[stem])
+        numbered.append(stem)
+    return numbered
+
+def output_name(input_file, uf, cselect, output_format='text', stem=None):
+    '''Returns the name of the output file for a job, tagged with any options that differ from the
+    defaults, and with an extension matching the output format.
+
+    :param stem: name to tag (input_file's name without its extension if None)
+    '''
+
+    name = os.path.splitext(os.path.basename(input_file))[0] if stem is None else stem
+    if not uf:
+        name += '.no_uf'
+    if not cselect:
+        name += '.no_cselect'
+    return name + ('.txt' if output_format == 'text' else '.' + output_format)
+
+def make_jobs(input_files, output_dir, uf_values, cselect_values, log, cats, dependents,
+              cache_dir=None, output_format='text'):
+    '''Returns a list of job dicts, one for each combination of input file and options. Every job
+    has its own output file, even when inputs in different directories share a name (see
+    output_stems); a ValueError is raised if that cannot be arranged.
+
+    :param cache_dir: directory of the result cache (no caching if None)
+    :param output_format: one of formats.FORMATS
+    '''
+
+    jobs = []
+    for (input_file, stem), uf, cselect in itertools.product(
+            zip(input_files, output_stems(input_files)), uf_values, cselect_values):
+        name = output_name(input_file, uf, cselect, output_format, stem)
+        jobs.append({'input': input_file,
+                     'output': os.path.join(output_dir, name),
+                     'uf': uf, 'cselect': cselect,
+                     'log': log, 'cats': cats, 'dependents': dependents,
+                     'cache_dir': cache_dir, 'format': output_format})
+    outputs = collections.Counter(job['output'] for job in jobs)
+    clashes = sorted(output for output, count in outputs.items() if count > 1)
+    if clashes:
+        raise ValueError('several jobs would write to {}'.format(', '.join(clashes)))
+    return jobs
+
+@functools.lru_cache(maxsize=16)
+def load_grammar(input_file):
+    '''Returns the Grammar of an input file or compiled lexicon, reusing it if this process has
+    loaded the same file recently.
+    '''
+
+    return Grammar(*load_input(input_file))
+
+def _describe(error):
+    '''Returns a description of an OSError without its error number.'''
+
+    if error.strerror is None:
+        return str(error)
+    if error.filename is None:
+        return error.strerror
+    return '{}: {!r}'.format(error.strerror, error.filename)
+
+def run_job(job):
+    '''Runs a single job, writing its output file, and returns its summary record. Failures to
+    read, parse or write a job's files are recorded in the summary rather than raised, so that one
+    bad input cannot stop the rest of a batch.
+    '''
+
+    record = {'input': job['input'], 'output': job['output'],
+              'uf': job['uf'], 'cselect': job['cselect']}
+    start = time.perf_counter()
+    try:
+        grammar = load_grammar(job['input'])
+    except OSError as e:
+        record['error'] = 'input failure: ' + _describe(e)
+    except UnicodeDecodeError as e:
+        record['error'] = 'input failure: {} is not valid UTF-8 ({} at byte {})'.format(
+            job['input'], e.reason, e.start)
+    except ParserError as e:
+        record['error'] = 'parsing failure: {}'.format(e)
+    else:
+        cache = ResultCache(job['cache_dir']) if job['cache_dir'] is not None else None
+        try:
+            lex = cached_lexicon(grammar, None, job['uf'], job['cselect'], job['log'], cache)
+            with open(job['output'], 'w', encoding='utf-8') as f:
+                write_output(lex, f, job['format'], job['log'], job['cats'], job['dependents'])
+        except OSError as e: # writing the output file or the cached result
+            record['error'] = 'output failure: ' + _describe(e)
+        else:
+            record['stats'] = lex.counts()
+            record['fingerprint'] = fingerprint(lex)
+    record['wall_time'] = time.perf_counter() - start
+    return record
+
+def run_batch(jobs, summary_file, workers=None):
+    '''Runs jobs over a pool of worker processes, writing a summary line for each to summary_file
+    in job order. Returns the number of failed jobs.
+
+    :param workers: number of worker processes (all available CPUs if None, and no pool if 1)
+    '''
+
+    failures = 0
+    with open(summary_file, 'w', encoding='utf-8') as summary:
+        if workers == 1:
+            records = map(run_job, jobs)
+            executor = None
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            records = executor.map(run_job, jobs, chunksize=max(1, len(jobs) // 64))
+        try:
+            for record in records:
+                if 'error' in record:
+                    failures += 1
+                summary.write(json.dumps(record, ensure_ascii=False) + '\n')
+                summary.flush()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    return failures
@@ -0,0 +1,5 @@
+'''Benchmarking tools for ALPAFA: a seeded generator of synthetic input files (bench.generate), a
+harness timing parsing, learning and rendering across sweeps of input sizes (bench.harness), and a
+differential check that the alternative engines agree with the reference engine
+(bench.differential). Run "python -m alpafa.bench --help" for the command line interface.
+'''
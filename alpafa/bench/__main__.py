@@ -0,0 +1,101 @@
+'''Command line interface for the ALPAFA benchmarks.'''
+
+import argparse
+import json
+import sys
+from ..engines import ENGINES
+from .differential import check_engines
+from .generate import write_grammar
+from .harness import compare, grammar_params, run_benchmarks
+
+def set_args():
+    '''Sets command line parameters.'''
+
+    parser = argparse.ArgumentParser(prog='python -m alpafa.bench',
+                                     description='Times ALPAFA on synthetic inputs of increasing \
+                                     size, generates a single synthetic input file, or checks that \
+                                     the engines give identical results.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[50, 100, 200, 400],
+                        help='numbers of heads to benchmark (default: 50 100 200 400)')
+    parser.add_argument('--properties', type=int, default=10,
+                        help='number of bare properties in each input (default: 10)')
+    parser.add_argument('--set_properties', type=int, default=None,
+                        help='number of set-valued properties in each input (default: a quarter \
+                        of its number of heads)')
+    parser.add_argument('--movement_properties', type=int, default=None,
+                        help='number of properties borne as movement pairs in each input \
+                        (default: a twentieth of its number of heads)')
+    parser.add_argument('--prominence_length', type=int, default=None,
+                        help='number of properties in each input\'s prominence order (default: \
+                        all of them)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per case, of which the fastest is kept (default: 3)')
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON results file to compare these results against')
+    parser.add_argument('--generate', metavar='FILE',
+                        help='write a synthetic input file with the first of --sizes heads, \
+                        instead of benchmarking')
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help='engine to benchmark (default: python)')
+    parser.add_argument('--check_engines', nargs='*', metavar='INPUT',
+                        help='instead of benchmarking, check that every engine gives the same \
+                        results as the python engine on these input files or directories, and on \
+                        --grammars synthetic inputs generated from --seed')
+    parser.add_argument('--grammars', type=int, default=100,
+                        help='number of synthetic inputs for --check_engines (default: 100)')
+    args = parser.parse_args()
+    for option in ('properties', 'set_properties', 'movement_properties', 'prominence_length'):
+        if getattr(args, option) is not None and getattr(args, option) < 0:
+            parser.error('--{} must not be negative'.format(option))
+    if args.prominence_length == 0:
+        parser.error('--prominence_length must be at least 1')
+    return args
+
+def main():
+    args = set_args()
+    if args.generate:
+        write_grammar(args.generate, **grammar_params(args.sizes[0], args.seed, args.properties,
+                                                      args.set_properties,
+                                                      args.movement_properties,
+                                                      args.prominence_length))
+        return
+    if args.check_engines is not None:
+        def report(name, mismatches):
+            '''Prints a line for each checked input.'''
+
+            print('{}  {}'.format('ok      ' if not mismatches else 'MISMATCH', name))
+            for engine, uf, cselect in mismatches:
+                print('    {} engine, uf {}, cselect {}'.format(engine, 'on' if uf else 'off',
+                                                               'on' if cselect else 'off'))
+            sys.stdout.flush()
+
+        mismatches = check_engines(args.check_engines, args.grammars, args.seed, progress=report)
+        print('{} mismatches'.format(len(mismatches)))
+        sys.exit(1 if mismatches else 0)
+
+    def progress(run):
+        '''Prints a line for each completed run.'''
+
+        print('{:>6} heads  uf {:<3}  cselect {:<3}  parse {:8.4f}s  learn {:8.4f}s  '
+              'render {:8.4f}s  {} categories'
+              .format(run['params']['heads'], 'on' if run['uf'] else 'off',
+                      'on' if run['cselect'] else 'off', run['parse'], run['learn'],
+                      run['render'], run['stats']['categories']))
+        sys.stdout.flush()
+
+    results = run_benchmarks(args.sizes, args.seed, args.repeat, args.properties,
+                             progress=progress, engine=args.engine,
+                             set_properties=args.set_properties,
+                             movement_properties=args.movement_properties,
+                             prominence_length=args.prominence_length)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        print('\n'.join(compare(old, results)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''Checks that every alternative engine (see alpafa.engines) learns exactly the same lexicons as the
+reference engine, comparing the full output (log, categories with their dependent features, and
+heads) of each combination of the uf and c-selection options, on given input files and on seeded
+synthetic inputs of varied shapes.
+'''
+
+import random
+from ..alpafa import Grammar, Lexicon
+from ..batch import expand_inputs
+from ..compiled import load_input
+from ..engines import ENGINES
+from ..parse import parse_text
+from .generate import generate
+
+OPTIONS = ((True, True), (True, False), (False, True), (False, False)) # (uf, cselect)
+
+def synthetic_grammars(count, seed=0):
+    '''Yields a name and Grammar for each of count small synthetic inputs, whose sizes and numbers
+    of each kind of property are drawn at random, so that between them they exercise every branch
+    of the algorithm.
+    '''
+
+    rng = random.Random(seed)
+    for i in range(count):
+        params = {'seed': rng.randrange(2**32),
+                  'heads': rng.randint(2, 60),
+                  'properties': rng.randint(1, 9),
+                  'set_properties': rng.randint(0, 8),
+                  'movement_properties': rng.randint(0, 3),
+                  'density': round(rng.uniform(0.1, 0.6), 2)}
+        name = 'synthetic {} ({})'.format(i, ', '.join('{}={}'.format(key, value)
+                                                       for key, value in sorted(params.items())))
+        yield name, Grammar(*parse_text(generate(**params)))
+
+def check_grammar(grammar, engines=ENGINES[1:]):
+    '''Returns a list of the (engine, uf, cselect) combinations for which an engine's output for
+    grammar differs from the reference engine's.
+    '''
+
+    mismatches = []
+    for uf, cselect in OPTIONS:
+        expected = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect).display(True, True, True)
+        for engine in engines:
+            lex = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect, engine=engine)
+            if lex.display(True, True, True) != expected:
+                mismatches.append((engine, uf, cselect))
+    return mismatches
+
+def check_engines(inputs=(), count=100, seed=0, engines=ENGINES[1:], progress=None):
+    '''Compares engines against the reference engine on inputs (files, or directories of them) and
+    count synthetic inputs generated from seed. Returns a list of (name, engine, uf, cselect)
+    tuples describing every mismatch, which is empty if the engines agree throughout.
+
+    :param progress: function called with the name of each input and its mismatches once checked
+    '''
+
+    def grammars():
+        '''Yields a name and Grammar for each input to check.'''
+
+        for input_file in expand_inputs(inputs):
+            yield input_file, Grammar(*load_input(input_file))
+        yield from synthetic_grammars(count, seed)
+
+    mismatches = []
+    for name, grammar in grammars():
+        found = check_grammar(grammar, engines)
+        mismatches.extend((name,) + mismatch for mismatch in found)
+        if progress is not None:
+            progress(name, found)
+    return mismatches
@@ -0,0 +1,65 @@
+'''Generates synthetic ALPAFA input files in the format read by parse.parse_file. Every random
+choice is drawn from a random.Random seeded by the caller, so the same parameters and seed always
+give the same grammar.
+'''
+
+import random
+
+MAX_BEARERS = 8 # most heads bearing a set-valued property, so inputs grow linearly in heads
+
+def generate(seed=0, heads=50, properties=20, set_properties=10, movement_properties=5,
+             prominence_length=None, density=0.3):
+    '''Returns the text of a synthetic input file.
+
+    :param seed: seed for the random number generator
+    :param heads: number of heads
+    :param properties: number of bare properties, p0, p1, ...
+    :param set_properties: number of set-valued properties, each a set of head names, borne by up
+                           to MAX_BEARERS random heads (these are what c-selection looks for)
+    :param movement_properties: number of properties that some heads bear as <p, m> movement pairs
+                                rather than as bare properties
+    :param prominence_length: number of properties in the prominence order (all of them if None)
+    :param density: probability of each head bearing each bare property
+    '''
+
+    rng = random.Random(seed)
+    names = ['H{}'.format(i) for i in range(heads)]
+    props = ['p{}'.format(i) for i in range(properties)]
+    moving = set(rng.sample(props, min(movement_properties, properties)))
+    head_props = {name: [] for name in names}
+
+    for name in names:
+        for prop in props:
+            if rng.random() < density:
+                if prop in moving and rng.random() < 0.5:
+                    head_props[name].append('<{}, m>'.format(prop))
+                else:
+                    head_props[name].append(prop)
+        if props and rng.random() < density:
+            head_props[name].append('{{{}}}'.format(rng.choice(props))) # {p} sets, for uf
+        if props and not head_props[name]:
+            head_props[name].append(rng.choice(props))
+
+    head_sets = {name: set(head_props[name]) for name in names}
+    for _ in range(set_properties):
+        members = rng.sample(names, rng.randint(1, max(1, min(heads, 6))))
+        prop = '{{{}}}'.format(', '.join(members))
+        for name in rng.sample(names, rng.randint(1, max(1, min(heads // 4, MAX_BEARERS)))):
+            if prop not in head_sets[name]:
+                head_sets[name].add(prop)
+                head_props[name].append(prop)
+
+    if prominence_length is None:
+        prominence_length = properties
+    prominence = rng.sample(props, min(prominence_length, properties))
+
+    lines = ['{}: {}'.format(name, ', '.join(head_props[name])) for name in names]
+    lines.append('')
+    lines.append('prominence = ' + ', '.join(prominence))
+    return '\n'.join(lines) + '\n'
+
+def write_grammar(output_file, **params):
+    '''Writes a synthetic input file generated with params (see generate) to output_file.'''
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(generate(**params))
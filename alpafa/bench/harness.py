@@ -0,0 +1,120 @@
+'''Times the phases of an ALPAFA run (parsing, learning and rendering) on synthetic inputs of
+increasing size, with and without c-selection and unvalued features, and saves the results as JSON
+so that runs from different versions can be compared.
+'''
+
+import io
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+from .. import __version__
+from ..alpafa import Lexicon
+from ..parse import parse_file
+from .generate import write_grammar
+
+def time_run(input_file, uf_choice, c_select_choice, repeat=3, engine='python'):
+    '''Returns a dict of the best times over repeat runs for parsing input_file, learning, and
+    rendering the full output, along with the run's statistics.
+
+    :param engine: engine to learn with (see engines.ENGINES)
+    '''
+
+    best = {'parse': float('inf'), 'learn': float('inf'), 'render': float('inf')}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prominence, heads = parse_file(input_file)
+        parsed = time.perf_counter()
+        lex = Lexicon(prominence, heads, uf_choice, c_select_choice, engine=engine)
+        learned = time.perf_counter()
+        lex.write(io.StringIO(), True, True, True)
+        rendered = time.perf_counter()
+        best['parse'] = min(best['parse'], parsed - start)
+        best['learn'] = min(best['learn'], learned - parsed)
+        best['render'] = min(best['render'], rendered - learned)
+    best['stats'] = lex.counts()
+    return best
+
+def grammar_params(heads, seed=0, properties=10, set_properties=None, movement_properties=None,
+                   prominence_length=None):
+    '''Returns the parameters of generate.generate for a synthetic grammar with heads heads.
+
+    :param set_properties: number of set-valued properties (a quarter of heads if None)
+    :param movement_properties: number of movement properties (a twentieth of heads if None)
+    :param prominence_length: number of properties in the prominence order (all of them if None)
+    '''
+
+    params = {'seed': seed, 'heads': heads,
+              'properties': properties,
+              'set_properties': max(1, heads // 4) if set_properties is None else set_properties,
+              'movement_properties': (max(1, heads // 20) if movement_properties is None else
+                                      movement_properties)}
+    if prominence_length is not None: # left out otherwise, to match results saved without it
+        params['prominence_length'] = prominence_length
+    return params
+
+def run_benchmarks(sizes, seed=0, repeat=3, properties=10, uf_values=(True, False),
+                   cselect_values=(True, False), progress=None, engine='python',
+                   set_properties=None, movement_properties=None, prominence_length=None):
+    '''Generates a synthetic grammar for each number of heads in sizes, and times a run for each
+    combination of options. Returns the results as a JSON-serialisable dict.
+
+    :param properties: number of bare properties, held fixed across sizes (the number of
+                       categories grows exponentially with it)
+    :param progress: function called with each result as it is completed
+    :param engine: engine to learn with (see engines.ENGINES)
+    :param set_properties: number of set-valued properties (a quarter of each size if None)
+    :param movement_properties: number of movement properties (a twentieth of each size if None)
+    :param prominence_length: number of properties in the prominence order (all of them if None)
+    '''
+
+    results = {'version': __version__,
+               'python': platform.python_version(),
+               'machine': platform.machine(),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'seed': seed,
+               'engine': engine,
+               'properties': properties,
+               'set_properties': set_properties,
+               'movement_properties': movement_properties,
+               'prominence_length': prominence_length,
+               'runs': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for heads in sizes:
+            params = grammar_params(heads, seed, properties, set_properties, movement_properties,
+                                    prominence_length)
+            input_file = os.path.join(tmp, 'grammar{}.txt'.format(heads))
+            write_grammar(input_file, **params)
+            for uf, cselect in itertools.product(uf_values, cselect_values):
+                run = {'params': params, 'uf': uf, 'cselect': cselect}
+                run.update(time_run(input_file, uf, cselect, repeat, engine))
+                results['runs'].append(run)
+                if progress is not None:
+                    progress(run)
+    return results
+
+def _run_key(run):
+    '''Returns a key identifying the case a run measures, for matching runs between results.'''
+
+    return (json.dumps(run['params'], sort_keys=True), run['uf'], run['cselect'])
+
+def compare(old, new):
+    '''Returns a list of lines comparing the times of the runs common to two sets of results, as
+    new/old ratios (so values above 1 are slowdowns).
+    '''
+
+    old_runs = {_run_key(run): run for run in old['runs']}
+    lines = ['{:>6} {:>3} {:>7} {:>8} {:>8} {:>8}'.format('heads', 'uf', 'cselect', 'parse',
+                                                         'learn', 'render')]
+    for run in new['runs']:
+        base = old_runs.get(_run_key(run))
+        if base is None:
+            continue
+        ratios = ['{:8.2f}'.format(run[phase] / base[phase]) if base[phase] else '     n/a'
+                  for phase in ('parse', 'learn', 'render')]
+        lines.append('{:>6} {:>3} {:>7} '.format(run['params']['heads'], 'on' if run['uf'] else
+                                                 'off', 'on' if run['cselect'] else 'off') +
+                     ' '.join(ratios))
+    return lines
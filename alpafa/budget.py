@@ -0,0 +1,96 @@
+'''Limits on the resources a learning run may use, and reports of its progress. Some inputs make
+the algorithm run for a very long time (c-selection can keep appending new categories to the
+prominence order, each of which is another loop), so a Lexicon can be given a Budget, and stops
+learning cleanly between loops once any of its limits is reached, keeping everything learned so
+far. A Monitor checks the budget before each loop, and passes a report of the run's progress to a
+callback at regular intervals. Lexicons without a budget or progress callback have no Monitor, and
+pay nothing for either.
+'''
+
+import collections
+import sys
+import time
+
+# name of each limit in a Budget -> description used by Lexicon.stats when it stops a run
+LIMITS = collections.OrderedDict([('max_categories', 'the limit of {} categories'),
+                                  ('max_loops', 'the limit of {} loops'),
+                                  ('time_limit', 'the time limit of {} seconds')])
+
+class Budget(collections.namedtuple('Budget', list(LIMITS))):
+    '''Limits on a learning run, each None for no limit: the number of categories (learning stops
+    once there are more), the number of loops over the prominence order, and the wall-clock
+    seconds spent in each call that learns (creating the Lexicon, or Lexicon.resume,
+    Lexicon.update or Lexicon.extend).
+    '''
+
+    __slots__ = ()
+
+    def __new__(cls, max_categories=None, max_loops=None, time_limit=None):
+        return super().__new__(cls, max_categories, max_loops, time_limit)
+
+class Monitor():
+    '''Checks a Lexicon's learning against a Budget, and reports its progress.'''
+
+    def __init__(self, budget=None, progress=None, interval=1.0):
+        ''':param budget: a Budget (no limits if None)
+           :param progress: function called with a progress report (see self.report) every
+                            interval seconds while learning
+        '''
+
+        self.budget = Budget() if budget is None else budget
+        self.progress = progress
+        self.interval = interval
+        self.started = None
+        self.deadline = None
+        self.next_report = None
+
+    def start(self):
+        '''Starts timing a call that learns.'''
+
+        self.started = time.monotonic()
+        if self.budget.time_limit is not None:
+            self.deadline = self.started + self.budget.time_limit
+        self.next_report = self.started + self.interval
+
+    def report(self, lex, now=None):
+        '''Returns a dict of the number of loops carried out by lex, the number of prominence
+        entries still queued, the number of categories, and the seconds since self.start.
+        '''
+
+        if now is None:
+            now = time.monotonic()
+        return {'loop': lex._position,
+                'queued': len(lex.prominence) - lex._position,
+                'categories': len(lex.categories),
+                'elapsed': now - self.started}
+
+    def check(self, lex):
+        '''Called before each loop. Reports progress if it is due, and returns the name of the limit
+        lex has reached, or None if it can carry on.
+        '''
+
+        if self.progress is not None or self.deadline is not None:
+            now = time.monotonic()
+            if self.progress is not None and now >= self.next_report:
+                self.progress(self.report(lex, now))
+                self.next_report = now + self.interval
+        budget = self.budget
+        if budget.max_categories is not None and len(lex.categories) > budget.max_categories:
+            return 'max_categories'
+        if budget.max_loops is not None and lex._position >= budget.max_loops:
+            return 'max_loops'
+        if self.deadline is not None and now >= self.deadline:
+            return 'time_limit'
+        return None
+
+def format_progress(report):
+    '''Returns a line describing a progress report made by a Monitor.'''
+
+    return 'loop {}, {} queued, {} categories, {:.1f}s'.format(
+        report['loop'], report['queued'], report['categories'], report['elapsed'])
+
+def print_progress(report):
+    '''Prints a progress report to stderr (for use as a Monitor's progress callback).'''
+
+    print('alpafa: ' + format_progress(report), file=sys.stderr)
+    sys.stderr.flush()
@@ -0,0 +1,152 @@
+'''A content-addressed on-disk cache of learned Lexicons. Results are keyed by a hash of the parsed
+heads, the prominence order, the uf/c-selection options, the ALPAFA version and the format of the
+pickled Lexicons (CACHE_FORMAT), so a cached result can be returned in place of running the
+algorithm again. The cache is bounded in size, evicting the least recently used results first.
+
+Results are stored with pickle, so only point the cache at directories you trust.
+'''
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from . import __version__
+from .alpafa import Grammar, Lexicon
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024 # bytes
+# version of the pickled form of Lexicons, which must be increased whenever the attributes of
+# Lexicon, Category, Head or anything else they hold change, so that results cached by earlier code
+# are never returned
+CACHE_FORMAT = 1
+
+def default_directory():
+    '''Returns the cache directory to use if none is given: $ALPAFA_CACHE_DIR if set, otherwise an
+    alpafa directory in the user's cache directory.
+    '''
+
+    if os.environ.get('ALPAFA_CACHE_DIR'):
+        return os.environ['ALPAFA_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'alpafa')
+
+def _canonical_property(prop):
+    '''Returns an order-independent, JSON-serialisable form of a head property.'''
+
+    if isinstance(prop, str):
+        return ['p', prop]
+    if isinstance(prop, frozenset):
+        return ['s', sorted(prop)]
+    return ['m'] + list(prop)
+
+def cache_key(prominence, heads=None, uf_choice=True, c_select_choice=True, log_choice=True):
+    '''Returns the cache key for running ALPAFA on heads with a given prominence order and options.
+
+    :param prominence: a prominence order, or a Grammar (in which case heads must be None)
+    '''
+
+    if isinstance(prominence, Grammar):
+        prominence, heads = prominence.prominence, prominence.heads
+    spec = {'version': __version__,
+            'format': CACHE_FORMAT,
+            'uf': bool(uf_choice),
+            'cselect': bool(c_select_choice),
+            'log': bool(log_choice),
+            'prominence': list(prominence),
+            'heads': [[head.name, sorted(_canonical_property(prop) for prop in head.properties)]
+                      for head in heads]}
+    data = json.dumps(spec, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+class ResultCache():
+    '''A directory of pickled Lexicons, named by their cache keys, whose total size is kept below
+    max_size by removing the least recently used results.
+    '''
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+
+    def _path(self, key):
+        '''Returns the path of the file caching the result under key.'''
+
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key):
+        '''Returns the Lexicon cached under key, or None if there isn't one.'''
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                lex = pickle.load(f)
+        except Exception: # unreadable, damaged, or written by incompatible code
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        return lex
+
+    def put(self, key, lex):
+        '''Caches lex under key, then evicts old results if the cache has grown too large.'''
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(lex, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        '''Removes the least recently used results until the cache is no larger than max_size.'''
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pickle'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError: # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        '''Removes every cached result.'''
+
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.unlink(os.path.join(self.directory, name))
+
+def cached_lexicon(prominence, heads=None, uf_choice=True, c_select_choice=True,
+                   log_choice=True, cache=None, engine='python'):
+    '''Returns the Lexicon for heads and prominence with the given options, taking it from cache if
+    possible, and otherwise running the algorithm and storing the result in cache.
+
+    :param prominence: a prominence order, or a Grammar (in which case heads must be None)
+    :param cache: a ResultCache (no caching if None)
+    :param engine: engine to learn with, if not cached (all engines give identical results, so
+                   results are shared between them)
+    '''
+
+    if cache is None:
+        return Lexicon(prominence, heads, uf_choice, c_select_choice, log_choice, engine=engine)
+    key = cache_key(prominence, heads, uf_choice, c_select_choice, log_choice)
+    lex = cache.get(key)
+    if lex is None:
+        lex = Lexicon(prominence, heads, uf_choice, c_select_choice, log_choice, engine=engine)
+        cache.put(key, lex)
+    return lex
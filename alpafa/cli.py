@@ -1,8 +1,38 @@
 '''Defines the command line interface for ALPALFA.'''
 
 import argparse
-from .alpafa import Lexicon
-from .parse import parse_file, ParserError
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from . import compare
+from .alpafa import Grammar, Lexicon
+from .budget import Budget, print_progress
+from .cache import ResultCache, cached_lexicon, default_directory
+from .compiled import compile_file, load_input
+from .engines import ENGINES
+from .formats import FORMATS
+from .parse import ParserError
+from .profiling import format_profile
+
+@contextlib.contextmanager
+def _paused_gc():
+    '''Pauses the cyclic garbage collector while loading an input, which creates no reference
+    cycles but very many objects that the collector would otherwise traverse again and again (more
+    than doubling the time taken on large inputs). This is done here, for the single-threaded
+    command line, rather than in the library, as the collector is shared by every thread.
+    '''
+
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
 
 def set_args():
     '''Sets command line parameters, and runs ALPAFA.'''
@@ -10,7 +40,8 @@ def set_args():
     parser = argparse.ArgumentParser(prog='alpafa',
                                      description='Applies the algorithm from AAFP to a correctly \
                                      formatted input file.')
-    parser.add_argument('input_file', help='correctly formatted UTF-8 input file')
+    parser.add_argument('input_file',
+                        help='correctly formatted UTF-8 input file, or compiled lexicon')
     parser.add_argument('output_file', help='name of file to output')
 
     parser.add_argument('--no_uf', dest='uf', action='store_false',
@@ -24,31 +55,351 @@ def set_args():
     parser.add_argument('--dependents', dest='dependents', action='store_true',
                         help='list all dependent features below their relevant categories (implies \
                         --categories)')
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help='report the calls and time spent in each phase of the algorithm \
+                        (bypasses the result cache)')
+    parser.add_argument('--memstats', dest='memstats', action='store_true',
+                        help='report the peak memory allocated while parsing, learning and \
+                        writing output, as traced by tracemalloc (which slows the run down)')
+    parser.add_argument('--engine', dest='engine', choices=ENGINES, default='python',
+                        help='implementation of the algorithm\'s loops over categories: pure \
+                        Python, or vectorised with numpy (which must be installed); both give \
+                        identical results (default: python)')
+    parser.add_argument('--max_categories', dest='max_categories', type=int, default=None,
+                        help='stop learning once more than this many categories have been created \
+                        (bypasses the result cache)')
+    parser.add_argument('--max_loops', dest='max_loops', type=int, default=None,
+                        help='stop learning after this many loops over the prominence order \
+                        (bypasses the result cache)')
+    parser.add_argument('--time_limit', dest='time_limit', type=float, default=None,
+                        help='stop learning after this many seconds (bypasses the result cache)')
+    parser.add_argument('--progress', dest='progress', action='store_true',
+                        help='report the current loop, number of queued prominence entries and \
+                        number of categories to stderr every second (bypasses the result cache)')
+    add_format_args(parser)
+    add_cache_args(parser)
 
     args = parser.parse_args()
     if args.dependents:
         args.cats = True
+    for limit in ('max_categories', 'max_loops', 'time_limit'):
+        if getattr(args, limit) is not None and getattr(args, limit) < 0:
+            parser.error('--{} must not be negative'.format(limit))
+    budget = Budget(args.max_categories, args.max_loops, args.time_limit)
 
     return (args.input_file, args.output_file, args.uf, args.cselect, args.log, args.cats,
-           args.dependents)
+           args.dependents, args.cache_dir, args.format, args.profile, args.memstats, args.engine,
+           budget if budget != Budget() else None, args.progress)
+
+def add_format_args(parser):
+    '''Adds the output format parameter to parser.'''
 
-def run_alpafa(input_file, output_file, uf, cselect, log, cats, dependents):
+    parser.add_argument('--format', dest='format', choices=FORMATS, default='text',
+                        help='output format: tabbed text, JSON, CSV or TSV records of each \
+                        head\'s features, or the tree of category divisions in Graphviz DOT \
+                        (default: text)')
+
+def add_cache_args(parser):
+    '''Adds the result cache parameters to parser.'''
+
+    parser.add_argument('--cache_dir', dest='cache_dir', default=default_directory(),
+                        help='directory for cached results (default: %(default)s)')
+    parser.add_argument('--no_cache', dest='cache_dir', action='store_const', const=None,
+                        help='do not read or write cached results')
+
+def run_alpafa(input_file, output_file, uf, cselect, log, cats, dependents, cache_dir=None,
+               output_format='text', profile=False, memstats=False, engine='python', budget=None,
+               progress=False):
     '''Parse an input file, and apply ALPAFA to its contents, printing the output to a specified
     file.
+
+    :param cache_dir: directory of the result cache (no caching if None)
+    :param output_format: one of formats.FORMATS
+    :param profile: print the time spent in each phase of the algorithm to stderr
+    :param memstats: print the peak memory allocated during the run to stderr
+    :param engine: one of engines.ENGINES
+    :param budget: a budget.Budget limiting the run (no limits if None)
+    :param progress: report the progress of learning to stderr
     '''
 
+    if memstats:
+        tracemalloc.start()
     try:
-        prominence, heads = parse_file(input_file)
+        with _paused_gc():
+            prominence, heads = load_input(input_file)
     except FileNotFoundError as e:
         print('alpafa: input failure: ' + str(e)[10:])
         return
     except ParserError as e:
         print('alpafa: parsing failure: {}'.format(e))
         return
-    lex = Lexicon(prominence, heads, uf, cselect)
+    try:
+        if profile or budget is not None or progress:
+            lex = Lexicon(prominence, heads, uf, cselect, log, profile_choice=profile,
+                          engine=engine, budget=budget,
+                          progress=print_progress if progress else None)
+        else:
+            cache = ResultCache(cache_dir) if cache_dir is not None else None
+            lex = cached_lexicon(prominence, heads, uf, cselect, log, cache, engine)
+    except ImportError as e:
+        print('alpafa: {}'.format(e))
+        return
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(lex.display(log, cats, dependents))
+        lex.render(f, output_format, log, cats, dependents)
     print(lex.stats())
+    if profile:
+        print(format_profile(lex.profile()), file=sys.stderr)
+    if memstats:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('peak memory: {:.1f} MiB ({:.1f} MiB still allocated)'
+              .format(peak / 2**20, current / 2**20), file=sys.stderr)
+
+def set_batch_args(argv):
+    '''Sets command line parameters for the batch subcommand.'''
+
+    parser = argparse.ArgumentParser(prog='alpafa batch',
+                                     description='Applies the algorithm from AAFP to many input \
+                                     files and option combinations, in parallel.')
+    parser.add_argument('inputs', nargs='+',
+                        help='input files, or directories containing .txt input files and .alpc \
+                        compiled lexicons')
+    parser.add_argument('output_dir', help='directory to write output files and summary to')
+
+    parser.add_argument('--uf', nargs='+', choices=['on', 'off'], default=['on'],
+                        help='unvalued feature settings to run (default: on)')
+    parser.add_argument('--cselect', nargs='+', choices=['on', 'off'], default=['on'],
+                        help='c-selection settings to run (default: on)')
+    parser.add_argument('--log', dest='log', action='store_true',
+                        help='include a log of algorithm operations')
+    parser.add_argument('--categories', dest='cats', action='store_true',
+                        help='list all categories before heads')
+    parser.add_argument('--dependents', dest='dependents', action='store_true',
+                        help='list all dependent features below their relevant categories (implies \
+                        --categories)')
+    parser.add_argument('--summary', dest='summary',
+                        help='JSONL summary file (default: OUTPUT_DIR/summary.jsonl)')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=None,
+                        help='number of worker processes (default: number of CPUs)')
+    add_format_args(parser)
+    add_cache_args(parser)
+
+    args = parser.parse_args(argv)
+    if args.dependents:
+        args.cats = True
+    if args.summary is None:
+        args.summary = os.path.join(args.output_dir, 'summary.jsonl')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    return (args.inputs, args.output_dir, [v == 'on' for v in args.uf],
+            [v == 'on' for v in args.cselect], args.log, args.cats, args.dependents, args.summary,
+            args.jobs, args.cache_dir, args.format)
+
+def run_alpafa_batch(inputs, output_dir, uf_values, cselect_values, log, cats, dependents,
+                     summary_file, workers, cache_dir=None, output_format='text'):
+    '''Apply ALPAFA to every combination of input file and options, writing each output to
+    output_dir and a summary line per job to summary_file.
+    '''
+
+    # imported here, like the server and search, so that other commands don't pay for loading
+    # multiprocessing and asyncio
+    from . import batch
+
+    input_files = batch.expand_inputs(inputs)
+    if not input_files:
+        print('alpafa: input failure: no input files found')
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        jobs = batch.make_jobs(input_files, output_dir, uf_values, cselect_values, log, cats,
+                               dependents, cache_dir, output_format)
+    except ValueError as e:
+        print('alpafa: output failure: {}'.format(e))
+        return
+    start = time.perf_counter()
+    failures = batch.run_batch(jobs, summary_file, workers)
+    print('alpafa: ran {} jobs ({} failed) in {:.2f}s, summary written to {}'
+          .format(len(jobs), failures, time.perf_counter() - start, summary_file))
+
+def set_compile_args(argv):
+    '''Sets command line parameters for the compile subcommand.'''
+
+    parser = argparse.ArgumentParser(prog='alpafa compile',
+                                     description='Compiles a correctly formatted input file to a \
+                                     binary lexicon, which loads faster than the text.')
+    parser.add_argument('input_file', help='correctly formatted UTF-8 input file')
+    parser.add_argument('output_file', help='name of compiled lexicon file to output')
+
+    args = parser.parse_args(argv)
+    return (args.input_file, args.output_file)
+
+def run_compile(input_file, output_file):
+    '''Parse an input file and write it to a compiled lexicon file.'''
+
+    try:
+        with _paused_gc():
+            compile_file(input_file, output_file)
+    except FileNotFoundError as e:
+        print('alpafa: input failure: ' + str(e)[10:])
+    except ParserError as e:
+        print('alpafa: parsing failure: {}'.format(e))
+
+def set_compare_args(argv):
+    '''Sets command line parameters for the compare subcommand.'''
+
+    parser = argparse.ArgumentParser(prog='alpafa compare',
+                                     description='Applies the algorithm from AAFP to several input \
+                                     files, groups the equivalent results, and describes the \
+                                     differences between two results.')
+    parser.add_argument('inputs', nargs='+',
+                        help='correctly formatted UTF-8 input files, or compiled lexicons')
+    parser.add_argument('--no_uf', dest='uf', action='store_false',
+                        help='do not implement unvalued features')
+    parser.add_argument('--no_cselect', dest='cselect', action='store_false',
+                        help='do not implement c-selection')
+    parser.add_argument('--json', dest='json', action='store_true',
+                        help='print fingerprints and differences as JSON')
+    add_cache_args(parser)
+
+    args = parser.parse_args(argv)
+    return (args.inputs, args.uf, args.cselect, args.json, args.cache_dir)
+
+def run_compare(inputs, uf, cselect, json_choice=False, cache_dir=None):
+    '''Apply ALPAFA to each input file, and print the groups of inputs with equivalent results.
+    With exactly two inputs, also print the differences between their results.
+    '''
+
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    lexicons = []
+    for input_file in inputs:
+        try:
+            with _paused_gc():
+                prominence, heads = load_input(input_file)
+        except FileNotFoundError as e:
+            print('alpafa: input failure: ' + str(e)[10:])
+            return
+        except ParserError as e:
+            print('alpafa: parsing failure in {}: {}'.format(input_file, e))
+            return
+        lexicons.append(cached_lexicon(prominence, heads, uf, cselect, False, cache))
+
+    groups = compare.dedupe(lexicons)
+    differences = compare.diff(*lexicons) if len(lexicons) == 2 else None
+    if json_choice:
+        result = {'groups': [{'fingerprint': key, 'inputs': [inputs[i] for i in indices]}
+                             for key, indices in groups.items()]}
+        if differences is not None:
+            result['diff'] = differences
+        print(json.dumps(result, ensure_ascii=False, indent=1))
+        return
+    for key, indices in groups.items():
+        print(key[:16] + '\t' + ' '.join(inputs[i] for i in indices))
+    if differences is not None and not compare.is_empty(differences):
+        print()
+        print('\n'.join(compare.format_diff(differences, inputs[0], inputs[1])))
+
+def set_serve_args(argv):
+    '''Sets command line parameters for the serve subcommand.'''
+
+    parser = argparse.ArgumentParser(prog='alpafa serve',
+                                     description='Runs a server answering JSONL requests to apply \
+                                     the algorithm from AAFP, read from stdin or a Unix domain \
+                                     socket.')
+    parser.add_argument('--socket', dest='socket',
+                        help='path of a Unix domain socket to listen on (default: use stdin and \
+                        stdout)')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=None,
+                        help='number of worker processes (default: number of CPUs)')
+    add_cache_args(parser)
+
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    return (args.socket, args.jobs, args.cache_dir)
+
+def run_serve(socket_path, workers, cache_dir=None):
+    '''Serve requests until stdin is closed, or until interrupted if using a socket.'''
+
+    from . import server
+    try:
+        server.serve(socket_path, workers, cache_dir)
+    except server.ServerError as e:
+        print('alpafa: {}'.format(e))
+    except KeyboardInterrupt:
+        pass
+
+def set_search_args(argv):
+    '''Sets command line parameters for the search subcommand.'''
+
+    from .search import OBJECTIVES
+    parser = argparse.ArgumentParser(prog='alpafa search',
+                                     description='Searches the permutations of an input file\'s \
+                                     prominence order for those giving the most economical \
+                                     results.')
+    parser.add_argument('input_file',
+                        help='correctly formatted UTF-8 input file, or compiled lexicon')
+    parser.add_argument('--entries', nargs='+', metavar='ENTRY',
+                        help='prominence entries to permute, leaving the others in place \
+                        (default: all of them)')
+    parser.add_argument('--objective', choices=OBJECTIVES, default='categories',
+                        help='figure to minimise (default: categories)')
+    parser.add_argument('--top', type=int, default=5,
+                        help='number of orders to report (default: 5)')
+    parser.add_argument('--no_uf', dest='uf', action='store_false',
+                        help='do not implement unvalued features')
+    parser.add_argument('--no_cselect', dest='cselect', action='store_false',
+                        help='do not implement c-selection')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=None,
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--json', dest='json', action='store_true',
+                        help='print the orders found and search statistics as JSON')
+
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.top < 1:
+        parser.error('--top must be at least 1')
+    return (args.input_file, args.entries, args.objective, args.top, args.uf, args.cselect,
+            args.jobs, args.json)
+
+def run_search(input_file, entries, objective, top, uf, cselect, workers=None, json_choice=False):
+    '''Search the permutations of an input file's prominence order, and print the best orders
+    found, with the number of nodes of the search tree explored.
+    '''
+
+    from .search import search
+    try:
+        with _paused_gc():
+            grammar = Grammar(*load_input(input_file))
+    except FileNotFoundError as e:
+        print('alpafa: input failure: ' + str(e)[10:])
+        return
+    except ParserError as e:
+        print('alpafa: parsing failure: {}'.format(e))
+        return
+    try:
+        found = search(grammar, entries, objective, top, workers, uf, cselect)
+    except ValueError as e:
+        print('alpafa: {}'.format(e))
+        return
+    if json_choice:
+        print(json.dumps(found, ensure_ascii=False, indent=1))
+        return
+    for result in found['results']:
+        print('{}\t{}'.format(result['value'], ', '.join(result['prominence'])))
+    print('Explored {} nodes, of which {} were pruned.'.format(found['nodes'], found['pruned']))
+
+COMMANDS = {'batch': (set_batch_args, run_alpafa_batch),
+            'compile': (set_compile_args, run_compile),
+            'compare': (set_compare_args, run_compare),
+            'serve': (set_serve_args, run_serve),
+            'search': (set_search_args, run_search)}
 
 def main():
-    run_alpafa(*set_args())
+    argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        set_command_args, run_command = COMMANDS[argv[0]]
+        run_command(*set_command_args(argv[1:]))
+    else:
+        run_alpafa(*set_args())
@@ -0,0 +1,150 @@
+'''Compares learned Lexicons without rendering them. A lexicon's canonical form records each head's
+categorial, dependent and c-selectional features and each category's heads and features, with
+categorial features named rather than numbered and everything sorted, so it does not depend on the
+order in which features were introduced. Its fingerprint is a hash of the canonical form, so
+equivalent results (from different varieties, or different prominence orders in a sweep) can be
+grouped by fingerprint alone.
+'''
+
+import collections
+import hashlib
+import json
+
+def _signed_features(bearer):
+    '''Returns a sorted list of bearer's categorial features, as '+F' and '-F' strings.'''
+
+    features = []
+    spec = bearer.dspec
+    while spec:
+        low = spec & -spec
+        sign = '+' if bearer.dplus & low else '-'
+        features.append(sign + bearer.category_properties[low.bit_length() - 1])
+        spec ^= low
+    return sorted(features)
+
+def _c_select(bearer):
+    '''Returns the categorial features of bearer's c-selectional feature, or None.'''
+
+    if bearer.c_feat is None:
+        return None
+    return _signed_features(bearer.c_feat)
+
+def _category_name(cat):
+    '''Returns a display name for a category in canonical form, from its categorial features.'''
+
+    return '[' + ','.join(cat['features']) + ']'
+
+def canonical(lex):
+    '''Returns the canonical form of lex: a JSON-serialisable dict from 'heads' to a dict of each
+    head's features, and from 'categories' to a sorted list of each category's features and heads.
+    '''
+
+    heads = {head.name: {'features': _signed_features(head),
+                         'dependents': sorted(head.feats),
+                         'c_select': _c_select(head)}
+             for head in lex.heads}
+    categories = sorted(({'features': _signed_features(cat),
+                          'heads': sorted(head.name for head in cat),
+                          'dependents': sorted(cat.feats),
+                          'c_select': _c_select(cat)}
+                         for cat in lex), key=lambda cat: (cat['features'], cat['heads']))
+    return {'heads': heads, 'categories': categories}
+
+def fingerprint(lex):
+    '''Returns a hex digest identifying lex up to the order in which its features were introduced.
+    Lexicons have the same fingerprint if and only if they have the same canonical form.
+    '''
+
+    data = json.dumps(canonical(lex), ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def dedupe(lexicons):
+    '''Groups equivalent lexicons. Returns a dict from each distinct fingerprint to the indices in
+    lexicons of the lexicons bearing it, in order of first appearance.
+    '''
+
+    groups = collections.OrderedDict()
+    for i, lex in enumerate(lexicons):
+        groups.setdefault(fingerprint(lex), []).append(i)
+    return groups
+
+def _diff_lists(a, b):
+    '''Returns a dict of the items only in list a ('removed') and only in list b ('added').'''
+
+    a, b = collections.Counter(a), collections.Counter(b)
+    return {'removed': sorted((a - b).elements()), 'added': sorted((b - a).elements())}
+
+def diff(a, b):
+    '''Returns the structured differences between lexicons a and b, as a dict with 'heads' and
+    'categories' entries. Each gives the names of heads (or features of categories) only in a and
+    only in b, and for those in both, the features (or heads and features) that differ. Equivalent
+    lexicons give empty lists and dicts throughout.
+    '''
+
+    def compare(old, new, fields):
+        '''Returns the differences between two items' fields, omitting any that are equal.'''
+
+        changes = {}
+        for field in fields:
+            if old[field] == new[field]:
+                continue
+            if field == 'c_select':
+                changes[field] = {'from': old[field], 'to': new[field]}
+            else:
+                changes[field] = _diff_lists(old[field], new[field])
+        return changes
+
+    def compare_all(old, new, fields):
+        '''Compares two dicts of items, by key.'''
+
+        changed = {}
+        for key in sorted(old.keys() & new.keys()):
+            changes = compare(old[key], new[key], fields)
+            if changes:
+                changed[key] = changes
+        return {'only_a': sorted(old.keys() - new.keys()),
+                'only_b': sorted(new.keys() - old.keys()),
+                'changed': changed}
+
+    a, b = canonical(a), canonical(b)
+    heads = compare_all(a['heads'], b['heads'], ('features', 'dependents', 'c_select'))
+    categories = compare_all({_category_name(cat): cat for cat in a['categories']},
+                             {_category_name(cat): cat for cat in b['categories']},
+                             ('heads', 'dependents', 'c_select'))
+    return {'heads': heads, 'categories': categories}
+
+def is_empty(differences):
+    '''Returns True if differences, returned by diff, records no differences.'''
+
+    return not any(part[key] for part in differences.values()
+                   for key in ('only_a', 'only_b', 'changed'))
+
+def format_diff(differences, name_a='a', name_b='b'):
+    '''Returns a list of readable lines describing differences returned by diff.'''
+
+    def show(values):
+        '''Formats a list of features or heads, or a c-selectional feature.'''
+
+        if values is None:
+            return 'none'
+        return ','.join(values)
+
+    lines = []
+    for part, label in (('heads', 'head'), ('categories', 'category')):
+        for key in differences[part]['only_a']:
+            lines.append('{} {} only in {}'.format(label, key, name_a))
+        for key in differences[part]['only_b']:
+            lines.append('{} {} only in {}'.format(label, key, name_b))
+        for key, changes in differences[part]['changed'].items():
+            for field, change in sorted(changes.items()):
+                if field == 'c_select':
+                    lines.append('{} {}: c_select ({}) -> ({})'
+                                 .format(label, key, show(change['from']), show(change['to'])))
+                    continue
+                if change['removed']:
+                    lines.append('{} {}: {} only in {}: {}'
+                                 .format(label, key, field, name_a, show(change['removed'])))
+                if change['added']:
+                    lines.append('{} {}: {} only in {}: {}'
+                                 .format(label, key, field, name_b, show(change['added'])))
+    return lines
@@ -0,0 +1,198 @@
+'''Reads and writes compiled lexicons: a compact binary form of a parsed input file, which can be
+loaded without re-tokenising the text. A compiled file holds an interned table of every string in
+the input and a table of every distinct property, followed by the prominence order and each head's
+properties, all coded as integers into those tables. When loaded, the integer tables are read in
+place from the file's contents rather than copied out of them, and each distinct property is only
+built once, however many heads bear it.
+
+All integers are unsigned 32-bit little-endian. The layout is:
+
+    header      b'ALPC', format version, number of strings, number of integers
+    strings     number of strings + 1 offsets into the string data, then the UTF-8 string data
+    integers    prominence length, prominence string ids, then
+    properties  number of properties, then for each property its kind (0 for a bare property, 1
+                for a set, 2 for a movement pair) and string id, or for a set its size and member
+                string ids, then
+    heads       number of heads, then for each head its name string id, number of properties, and
+                property ids
+'''
+
+import array
+import itertools
+import struct
+import sys
+from .alpafa import Head
+from .parse import parse_file, ParserError
+
+MAGIC = b'ALPC'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sIII')
+_BARE, _SET, _MOVE = 0, 1, 2 # property kinds
+
+def _ints(values):
+    '''Returns an array of unsigned 32-bit ints in native byte order.'''
+
+    ints = array.array('I', values)
+    if ints.itemsize != 4:
+        ints = array.array('L', values)
+    return ints
+
+def _view_ints(data, start, count):
+    '''Returns the count unsigned 32-bit little-endian ints at start in data, as a memoryview of
+    data if the machine's byte order allows, or otherwise as a copied array.
+    '''
+
+    ints = _ints([])
+    if sys.byteorder == 'little':
+        return memoryview(data)[start:start + 4 * count].cast(ints.typecode)
+    ints.frombytes(data[start:start + 4 * count])
+    ints.byteswap()
+    return ints
+
+def is_compiled(input_file):
+    '''Returns True if input_file starts with the compiled lexicon magic number.'''
+
+    with open(input_file, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def write_compiled(prominence, heads, output_file):
+    '''Writes a parsed prominence order and list of Head objects to output_file in compiled form.
+    '''
+
+    strings = []
+    ids = {}
+
+    def intern(string):
+        '''Returns the id of string in the string table, adding it if necessary.'''
+
+        if string not in ids:
+            ids[string] = len(strings)
+            strings.append(string)
+        return ids[string]
+
+    prop_ints = []
+    prop_ids = {}
+
+    def property_id(prop):
+        '''Returns the id of prop in the property table, adding it if necessary.'''
+
+        if prop not in prop_ids:
+            prop_ids[prop] = len(prop_ids)
+            if isinstance(prop, str):
+                prop_ints.extend([_BARE, intern(prop)])
+            elif isinstance(prop, frozenset):
+                prop_ints.extend([_SET, len(prop)])
+                prop_ints.extend(intern(member) for member in sorted(prop))
+            else:
+                prop_ints.extend([_MOVE, intern(prop[0])])
+        return prop_ids[prop]
+
+    head_ints = [len(heads)]
+    for head in heads:
+        head_ints.extend([intern(head.name), len(head.properties)])
+        head_ints.extend(property_id(prop) for prop in head.properties)
+    ints = ([len(prominence)] + [intern(p) for p in prominence] + [len(prop_ids)] + prop_ints +
+            head_ints)
+
+    data = [string.encode('utf-8') for string in strings]
+    offsets = [0]
+    for item in data:
+        offsets.append(offsets[-1] + len(item))
+    offsets = _ints(offsets)
+    ints = _ints(ints)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        ints.byteswap()
+    blob = b''.join(data)
+    padding = b'\0' * (-len(blob) % 4) # keep the integers aligned
+
+    with open(output_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(strings), len(ints)))
+        f.write(offsets.tobytes())
+        f.write(blob + padding)
+        f.write(ints.tobytes())
+
+def compile_file(input_file, output_file):
+    '''Parses a correctly formatted input file and writes it to output_file in compiled form.'''
+
+    prominence, heads = parse_file(input_file)
+    write_compiled(prominence, heads, output_file)
+
+def _take(it, count):
+    '''Returns a list of the next count integers from it, raising ParserError if there are fewer.
+    '''
+
+    items = list(itertools.islice(it, count))
+    if len(items) != count:
+        raise ParserError("Truncated compiled lexicon")
+    return items
+
+def load_compiled(input_file):
+    '''Takes a compiled lexicon file and returns a parsed prominence order and list of Head
+    objects, as parse.parse_file would for the original input. Raises a ParserError if the file is
+    not a complete compiled lexicon.
+    '''
+
+    with open(input_file, 'rb') as f:
+        data = f.read()
+    try:
+        magic, version, nstrings, nints = _HEADER.unpack_from(data, 0)
+    except struct.error:
+        raise ParserError("Invalid compiled lexicon")
+    if magic != MAGIC:
+        raise ParserError("Invalid compiled lexicon")
+    if version != FORMAT_VERSION:
+        raise ParserError("Unsupported compiled lexicon version {}".format(version))
+
+    pos = _HEADER.size
+    if len(data) < pos + 4 * (nstrings + 1):
+        raise ParserError("Truncated compiled lexicon")
+    offsets = _view_ints(data, pos, nstrings + 1)
+    pos += 4 * (nstrings + 1)
+    if offsets[0] != 0 or any(start > end for start, end in zip(offsets, offsets[1:])):
+        raise ParserError("Invalid string table in compiled lexicon")
+    size = pos + offsets[-1] + (-offsets[-1] % 4) + 4 * nints
+    if len(data) != size:
+        raise ParserError("Truncated compiled lexicon" if len(data) < size else
+                          "Invalid compiled lexicon")
+    try:
+        strings = [sys.intern(str(data[pos + start:pos + end], 'utf-8'))
+                   for start, end in zip(offsets, offsets[1:])]
+    except UnicodeDecodeError:
+        raise ParserError("Invalid string table in compiled lexicon")
+    ints = _view_ints(data, pos + offsets[-1] + (-offsets[-1] % 4), nints)
+
+    it = iter(ints)
+    try:
+        prominence = [strings[n] for n in _take(it, next(it))]
+        props = []
+        for _ in range(next(it)):
+            kind = next(it)
+            if kind == _BARE:
+                props.append(strings[next(it)])
+            elif kind == _SET:
+                props.append(frozenset(strings[n] for n in _take(it, next(it))))
+            elif kind == _MOVE:
+                props.append((strings[next(it)], 'm'))
+            else:
+                raise ParserError("Invalid property in compiled lexicon")
+        heads = []
+        for _ in range(next(it)):
+            name = strings[next(it)]
+            heads.append(Head(name, frozenset([props[n] for n in _take(it, next(it))])))
+    except StopIteration:
+        raise ParserError("Truncated compiled lexicon")
+    except IndexError: # a string or property id out of range
+        raise ParserError("Invalid compiled lexicon")
+    if next(it, None) is not None:
+        raise ParserError("Invalid compiled lexicon")
+    return prominence, heads
+
+def load_input(input_file):
+    '''Returns a parsed prominence order and list of Head objects from either a text input file or
+    a compiled lexicon.
+    '''
+
+    if is_compiled(input_file):
+        return load_compiled(input_file)
+    return parse_file(input_file)
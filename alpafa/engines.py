@@ -0,0 +1,182 @@
+'''Alternative implementations of the parts of the algorithm that scan every category in a
+lexicon. The pure Python implementation in alpafa.alpafa is the reference (the "python" engine);
+other engines must produce exactly the same lexicons, which "python -m alpafa.bench
+--check_engines" verifies.
+
+The "numpy" engine mirrors a Lexicon's categories in a category x head membership matrix and a
+category x feature matrix of ternary d vectors, so that the search for the "smallest" category
+containing a property's heads and the choice of subcategories to divide are array operations
+rather than loops over categories. New categories are added to the matrices in bulk, when they
+are next needed. Finding the heads that select a category (whose prominence entries make up most of
+the loops over the prominence order) is a lookup by the category's bitmask, rather than by the
+names of its heads. Looking up the heads bearing other properties and the category coextensive with
+them are already single dict lookups on bitmasks, and are left to the Lexicon. numpy is only needed
+if the numpy engine is used.
+'''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENGINES = ('python', 'numpy')
+
+def create_engine(name):
+    '''Returns a new engine called name (one of ENGINES), or None for the reference engine.'''
+
+    if name == 'python':
+        return None
+    if name == 'numpy':
+        return NumpyEngine()
+    raise ValueError('unknown engine: {}'.format(name))
+
+class NumpyEngine():
+    '''Keeps matrices describing the categories of a single Lexicon, with a row for each category
+    in the order it was added. The matrices are only a cache of the Lexicon's categories: they are
+    rebuilt whenever the Lexicon replaces its list of categories (on Lexicon.restore, for
+    instance), and are not pickled.
+    '''
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('the numpy engine requires numpy')
+        self._categories = None # list of categories mirrored, as last seen
+        self._pending = [] # categories added to the lexicon since, yet to be given rows
+        self._index = None # property index selections was built from
+        self.selections = None # bitmask of a category's heads -> bitmask of heads selecting it
+        self.rows = [] # category in each row
+        self.members = None # bool, category x head: row i has a True for each head in rows[i]
+        self.features = None # int8, category x feature: row i is the d vector of rows[i]
+        self.sizes = None # number of heads in each row's category
+        self.lengths = None # number of categorial features of each row's category
+
+    def __reduce__(self):
+        return (type(self), ())
+
+    @staticmethod
+    def _bits(masks, width):
+        '''Returns a bool matrix with a row of the lowest width bits of each of a list of bitmasks.
+        '''
+
+        size = (width + 7) // 8
+        data = numpy.frombuffer(b''.join(mask.to_bytes(size, 'little') for mask in masks),
+                                dtype=numpy.uint8).reshape(len(masks), size)
+        return numpy.unpackbits(data, axis=1, count=width, bitorder='little').view(bool)
+
+    @classmethod
+    def _d(cls, bearers, width):
+        '''Returns an int8 matrix with a row of the d vector of each of a list of bearers.'''
+
+        return (cls._bits([bearer.dspec for bearer in bearers], width).astype(numpy.int8) +
+                cls._bits([bearer.dplus for bearer in bearers], width))
+
+    def _reserve(self, rows, columns):
+        '''Enlarges the matrices, if needed, to hold at least rows categories and columns features.
+        '''
+
+        capacity, width = self.features.shape
+        if rows <= capacity and columns <= width:
+            return
+        capacity, width = max(capacity, 2 * rows), max(width, 2 * columns)
+        members = numpy.zeros((capacity, self.members.shape[1]), dtype=bool)
+        features = numpy.zeros((capacity, width), dtype=numpy.int8)
+        count = len(self.rows)
+        members[:count] = self.members[:count]
+        features[:count, :self.features.shape[1]] = self.features[:count]
+        self.members, self.features = members, features
+        self.sizes = numpy.resize(self.sizes, capacity)
+        self.lengths = numpy.resize(self.lengths, capacity)
+
+    def _rebuild(self, lex):
+        '''Builds the matrices afresh from lex's categories.'''
+
+        self._categories = lex.categories
+        self._pending = list(lex.categories)
+        self.rows = []
+        capacity = max(16, 2 * len(lex.categories))
+        width = max(8, 2 * len(lex.category_properties))
+        self.members = numpy.zeros((capacity, len(lex.heads)), dtype=bool)
+        self.features = numpy.zeros((capacity, width), dtype=numpy.int8)
+        self.sizes = numpy.zeros(capacity, dtype=numpy.int64)
+        self.lengths = numpy.zeros(capacity, dtype=numpy.int64)
+
+    def _sync(self, lex):
+        '''Brings the matrices up to date with lex's categories, rebuilding them if lex has replaced
+        its list of categories.
+        '''
+
+        if lex.categories is not self._categories:
+            self._rebuild(lex)
+        if not self._pending:
+            return
+        cats, self._pending = self._pending, []
+        start, stop = len(self.rows), len(self.rows) + len(cats)
+        width = len(lex.category_properties)
+        self._reserve(stop, width)
+        self.members[start:stop] = self._bits([cat.mask for cat in cats], len(lex.heads))
+        self.features[start:stop, :width] = self._d(cats, width)
+        self.sizes[start:stop] = self.members[start:stop].sum(axis=1)
+        self.lengths[start:stop] = numpy.count_nonzero(self.features[start:stop, :width], axis=1)
+        self.rows.extend(cats)
+
+    def add(self, lex, cat):
+        '''Records cat, which has just been added to lex.categories.'''
+
+        if lex.categories is self._categories:
+            self._pending.append(cat)
+
+    def selecting(self, lex, category):
+        '''Returns a bitmask of the heads of lex with a property that is the set of names of the
+        heads in category, or None if lex's head names are not unique, in which case categories
+        cannot be identified by their heads' names (see Lexicon.headswith).
+        '''
+
+        if lex._property_index is not self._index:
+            self._index = lex._property_index
+            names = {head.name: head.mask for head in lex.heads}
+            if len(names) < len(lex.heads):
+                self.selections = None
+            else:
+                self.selections = {}
+                for prop, mask in self._index.items():
+                    if isinstance(prop, frozenset) and prop <= names.keys():
+                        selected = 0
+                        for name in prop:
+                            selected |= names[name]
+                        self.selections[selected] = mask
+        if self.selections is None:
+            return None
+        return self.selections.get(category.mask, 0)
+
+    def smallest(self, lex, headswithprop):
+        '''Returns the lowest ranked category of lex containing all the heads in the bitmask
+        headswithprop, and at least one other (see Lexicon._smallest).
+        '''
+
+        self._sync(lex)
+        count = len(self.rows)
+        heads = numpy.flatnonzero(self._bits([headswithprop], len(lex.heads))[0])
+        rows = numpy.flatnonzero(self.members[:count, heads].all(axis=1) &
+                                 (self.sizes[:count] != len(heads)))
+        # categories rank lower with more categorial features, then fewer heads (see
+        # Lexicon._rank), leaving few enough to compare by d vector one by one
+        rows = rows[self.lengths[rows] == self.lengths[rows].max()]
+        rows = rows[self.sizes[rows] == self.sizes[rows].min()]
+        return max((self.rows[i] for i in rows), key=lambda cat: cat.order_key)
+
+    def divide(self, lex, category, headswithprop):
+        '''Divides category and its relevant subcategories by the heads in headswithprop, returning
+        the new categories (see Lexicon._divide).
+        '''
+
+        self._sync(lex)
+        count = len(self.rows)
+        width = len(lex.category_properties)
+        plus, minus = self._bits([headswithprop, category.mask & ~headswithprop], len(lex.heads))
+        plus, minus = numpy.flatnonzero(plus), numpy.flatnonzero(minus)
+        d = self._d([category], width)[0]
+        specified = numpy.flatnonzero(d)
+        divisible = (numpy.all(self.features[:count, specified] == d[specified], axis=1) &
+                     self.members[:count, plus].any(axis=1) &
+                     self.members[:count, minus].any(axis=1))
+        return category.divide(headswithprop, [self.rows[i] for i in numpy.flatnonzero(divisible)])
@@ -0,0 +1,125 @@
+'''Machine-readable output formats for learned Lexicons. Each writer streams its output to a file
+object a record at a time. JSON output gives the categorial feature names, each head's d vector
+(2 for +, 1 for -, 0 for unspecified), c-selectional d vector and non-categorial features, and
+optionally the categories and log; CSV and TSV output give one row per head, with a column for each
+categorial feature. DOT output gives the tree of category divisions, for viewing with Graphviz.
+'''
+
+import csv
+import json
+
+FORMATS = ('text', 'json', 'csv', 'tsv', 'dot')
+
+def _signed(d):
+    '''Converts a d vector to a list of '+', '-' and '' values.'''
+
+    return ['+' if digit == 2 else '-' if digit == 1 else '' for digit in d]
+
+def head_record(head):
+    '''Returns a JSON-serialisable dict describing head's features.'''
+
+    return {'name': head.name,
+            'd': head.d,
+            'c_select': head.c_feat.d if head.c_feat is not None else None,
+            'features': list(head.feats)}
+
+def category_record(cat):
+    '''Returns a JSON-serialisable dict describing a category and its features.'''
+
+    return {'d': cat.d,
+            'parent': cat.parent.d if cat.parent is not None else None,
+            'heads': [head.name for head in cat],
+            'c_select': cat.c_feat.d if cat.c_feat is not None else None,
+            'features': list(cat.feats)}
+
+def event_record(event):
+    '''Returns a JSON-serialisable dict describing a LogEvent.'''
+
+    record = {'op': event.op, 'category': event.category.d}
+    if event.op == 'assign' and not isinstance(event.feature, str):
+        record['c_select'] = event.feature.d
+    else:
+        record['feature'] = event.feature
+    return record
+
+def write_json(lex, f, divlog_choice=False, cats_choice=False):
+    '''Writes lex to the file object f as a JSON object.
+
+    :param divlog_choice: include lex.log (which must have been kept)
+    :param cats_choice: include categories
+    '''
+
+    def write_array(key, records):
+        '''Writes a JSON array member, one record per line.'''
+
+        f.write(',\n"{}": ['.format(key))
+        for i, record in enumerate(records):
+            f.write(',\n' if i else '\n')
+            f.write(json.dumps(record, ensure_ascii=False))
+        f.write('\n]')
+
+    f.write('{"category_properties": ' + json.dumps(lex.category_properties, ensure_ascii=False))
+    write_array('heads', (head_record(head) for head in lex.heads))
+    if cats_choice:
+        write_array('categories', (category_record(cat) for cat in lex))
+    if divlog_choice:
+        if lex.log is None:
+            raise ValueError('no log was kept for this lexicon')
+        write_array('log', (event_record(event) for event in lex.log))
+    f.write(',\n"stats": ' + json.dumps(lex.counts()) + '}\n')
+
+def write_delimited(lex, f, delimiter=','):
+    '''Writes one row per head of lex to the file object f, with columns for the head's name, each
+    categorial feature ('+', '-', or empty), its c-selectional feature and its non-categorial
+    features.
+    '''
+
+    writer = csv.writer(f, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(['head'] + lex.category_properties + ['c_select', 'features'])
+    for head in lex.heads:
+        writer.writerow([head.name] + _signed(head.d) +
+                        [head.c_select(), ','.join(head.feats)])
+
+def _dot_string(string):
+    '''Returns string as a quoted DOT identifier.'''
+
+    return '"' + string.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+def write_dot(lex, f):
+    '''Writes the tree of category divisions in lex to the file object f as a Graphviz DOT graph,
+    with a node for each category, labelled with its categorial features and heads, and an edge
+    from each category to each category divided from it, labelled with the feature added.
+    '''
+
+    ids = {cat: i for i, cat in enumerate(lex.categories)}
+    f.write('digraph categories {\n')
+    f.write('node [shape=box];\n')
+    for cat, i in ids.items():
+        label = cat.dstring() + '\n' + ','.join(head.name for head in cat)
+        f.write('c{} [label={}];\n'.format(i, _dot_string(label)))
+    for cat, i in ids.items():
+        if cat.parent is not None:
+            new = cat.dspec & ~cat.parent.dspec
+            feature = ('+' if cat.dplus & new else '-') + \
+                      cat.category_properties[new.bit_length() - 1]
+            f.write('c{} -> c{} [label={}];\n'.format(ids[cat.parent], i, _dot_string(feature)))
+    f.write('}\n')
+
+def write_output(lex, f, output_format='text', divlog_choice=False, cats_choice=False,
+                 cats_dep_choice=False):
+    '''Writes lex to the file object f in one of FORMATS. Categories and the log are only included
+    in text and JSON output, and DOT output only gives categories.
+    '''
+
+    if output_format == 'text':
+        lex.write(f, divlog_choice, cats_choice, cats_dep_choice)
+    elif output_format == 'json':
+        write_json(lex, f, divlog_choice, cats_choice)
+    elif output_format == 'csv':
+        write_delimited(lex, f, ',')
+    elif output_format == 'tsv':
+        write_delimited(lex, f, '\t')
+    elif output_format == 'dot':
+        write_dot(lex, f)
+    else:
+        raise ValueError('unknown output format: {}'.format(output_format))
@@ -1,122 +1,224 @@
 '''Utlities for parsing correctly formatted UTF-8 input files, and return them as a prominence list
-and a list of alpafa.Head objects.
+and a list of alpafa.Head objects. Names and properties are interned, so that equal strings, sets
+and pairs from different lines of the input are shared rather than duplicated.
+
+Input is read a line at a time by scan, a generator yielding each head and prominence order along
+with any syntax errors, so that every error in an input can be reported at once, with its line and
+column. Most lines are recognised as a whole by a regular expression, and then each kind of
+property they contain (sets, ordered pairs and bare properties) is extracted by one more regular
+expression search; only lines that it does not recognise, which are either invalid or use unusual
+(but valid) bracketing such as {T}}, are checked item by item.
 '''
 
+import collections
+import re
+import sys
 from .alpafa import Head
 
+# a property list made only of bare properties, {sets} and <p, m> pairs, none of whose items
+# contain brackets (once spaces are removed)
+_ITEM = r'(?:[^,{}<>]+|\{[^{}<>]*\}|<[^,{}<>]*,m>)'
+_REGULAR = re.compile(_ITEM + r'(?:,' + _ITEM + r')*')
+# sets (with their brackets) and the first items of ordered pairs, within such a list
+_SET = re.compile(r'\{[^{}<>]*\}')
+_PAIR = re.compile(r'<([^,{}<>]*),m>')
+_OBJECT = re.compile(r'\{[^{}<>]*\}|<[^,{}<>]*,m>')
+
 class ParserError(Exception):
-    '''For parser-specific errors.'''
-    pass
-
-class ParseHead():
-    '''Parser for input file lines which represent a head. Designed to be created once per line,
-    with self.parse immediately being called, which returns a parsed frozenset of properties.'''
-
-    def __init__(self, linenum, line):
-
-        self._linenum = linenum # for more informative errors
-        self._name, separator, properties = line.partition(':')
-        if not (self._name and separator):
-            raise ParserError("Invalid syntax on line {} of input".format(self._linenum))
-        self._properties = properties.split(',') # split but unparsed properties list
-
-        # set during self.parse
-        self._index = None # current position in parsing this list
-        self._item = None # current object in list
-        self._setstart = None
-        self._tupstart = None
-
-        # always have the same initial values
-        self._prevobjend = 0 # position of last set or tuple
-        self._final_properties = []
-
-    def _open_bracket(self, tup=False):
-        '''Called when the parser comes across an open bracket - checks for illicit embeddings,
-        and updates instance attributes appropriately.
-
-        :param tup: < rather than {
-        '''
-
-        if self._tupstart is not None or self._setstart is not None:
-            raise ParserError("Set inside set on line {} of input".format(self._linenum))
-        # we're done with the chunk of properties up to here
-        self._final_properties += self._properties[self._prevobjend:self._index]
-        if tup:
-            self._tupstart = int(self._index)
-        else:
-            self._setstart = int(self._index)
-
-    def _close_bracket(self, tup=False):
-        '''Called when the parser comes across a closed bracket - checks for invalid closings (and
-        makes sure ordered pairs are well-formed), then adds the new subobject to
-        self.final_properties and updates instance attributes appropriately.
-
-        :param tup: > rather than }
-        '''
-        if tup and (self._tupstart is None or self._setstart is not None or
-                    self._index - self._tupstart != 1 or self._item != 'm>'):
-            raise ParserError("Invalid ordered set on line {} of input".format(self._linenum))
-        if not tup and (self._setstart is None or self._tupstart is not None):
-            raise ParserError("Invalid set on line {} of input".format(self._linenum))
-        if tup:
-            newtup = self._properties[self._tupstart:self._index+1]
-            newtup[0] = newtup[0].lstrip('<')
-            newtup[-1] = newtup[-1].rstrip('>')
-            self._final_properties.append(tuple(newtup))
-            self._tupstart = None
-        else:
-            newset = self._properties[self._setstart:self._index+1]
-            newset[0] = newset[0].lstrip('{')
-            newset[-1] = newset[-1].rstrip('}')
-            self._final_properties.append(frozenset(newset))
-            self._setstart = None
+    '''For parser-specific errors. errors lists every syntax error found in the input, as
+    ParseIssue objects (and is empty for errors not tied to a position in the input).
+    '''
 
-        self._prevobjend = self._index+1
+    def __init__(self, message, errors=()):
+        Exception.__init__(self, message)
+        self.errors = list(errors)
 
-    def parse(self):
-        '''Parses self._properties into frozenset of properties, which is combined with self.Name to
-        return a Head object.
-        '''
+class ParseIssue(collections.namedtuple('ParseIssue', ['line', 'column', 'message'])):
+    '''A syntax error at a line and column (both counted from 1) of an input.'''
 
-        for i, item in enumerate(self._properties):
-            self._index = i
-            self._item = item
+    __slots__ = ()
+
+    def __str__(self):
+        return '{} on line {}, column {} of input'.format(self.message, self.line, self.column)
+
+def _column(line, index):
+    '''Returns the column in line of the character at index once spaces are removed from line and
+    it is stripped, as it is before being parsed.
+    '''
+
+    unspaced = line.replace(' ', '')
+    index += len(unspaced) - len(unspaced.lstrip())
+    for column, char in enumerate(line, 1):
+        if char != ' ':
+            if index == 0:
+                return column
+            index -= 1
+    return len(line.rstrip('\r\n')) + 1
+
+def _intern(prop, interned):
+    '''Returns the shared copy of prop, a property string, set or ordered pair.
+
+    :param interned: dict from each property already parsed to itself
+    '''
+
+    shared = interned.get(prop)
+    if shared is None:
+        if isinstance(prop, str):
+            shared = sys.intern(prop)
+        elif isinstance(prop, frozenset):
+            shared = frozenset(sys.intern(item) for item in prop)
+        else:
+            shared = tuple(sys.intern(item) for item in prop)
+        interned[shared] = shared
+    return shared
 
-            if item.startswith('{'):
-                self._open_bracket()
-            elif item.startswith('<'):
-                self._open_bracket(tup=True)
+def _regular_properties(props, interned):
+    '''Returns the frozenset of properties in a property list matched by _REGULAR. Each kind of
+    property is extracted by a single regular expression search, and bare properties, which are
+    interned by sys.intern alone, are never looked at individually.
 
-            if item.endswith('}'):
-                self._close_bracket()
-            elif item.endswith('>'):
-                self._close_bracket(tup=True)
+    :param interned: dict from each property already parsed to itself, and from the text of each
+                     set already parsed to the set
+    '''
 
-        if self._setstart is not None or self._tupstart is not None:
-            raise ParserError("Unclosed bracket on line {} of input".format(linenum))
+    properties = set(map(sys.intern, filter(None, _OBJECT.sub('', props).split(','))))
+    if '{' in props:
+        for braced in _SET.findall(props):
+            prop = interned.get(braced)
+            if prop is None:
+                prop = frozenset(map(sys.intern, braced[1:-1].split(',')))
+                prop = interned[braced] = interned.setdefault(prop, prop)
+            properties.add(prop)
+    if '<' in props:
+        for first in _PAIR.findall(props):
+            properties.add(_intern((first, 'm'), interned))
+    return frozenset(properties)
+
+def _itemwise_properties(props, start, interned):
+    '''Parses a property list that _REGULAR does not match, an item (comma separated string) at a
+    time. Returns the frozenset of properties, and a list of (index, message) pairs for each
+    syntax error, where index is the position in the line of the item it was found in.
+
+    :param start: position of props in the line
+    :param interned: dict from each property already parsed to itself
+    '''
 
-        self._final_properties += self._properties[self._prevobjend:]
+    properties = []
+    errors = []
+    opened = None # '{' or '<' while in a set or ordered pair
+    first = None # index in items of the first item of the current set or ordered pair
+    items = props.split(',')
+    positions = []
+    for item in items:
+        positions.append(start)
+        start += len(item) + 1
+
+    for i, item in enumerate(items):
+        bracket = item[:1]
+        if bracket == '{' or bracket == '<':
+            if opened is not None:
+                errors.append((positions[i], 'Set inside set'))
+            opened, first = bracket, i
+
+        end = item[-1:]
+        if end == '}':
+            if opened != '{':
+                errors.append((positions[i], 'Invalid set'))
+            else:
+                members = items[first:i+1]
+                members[0] = members[0].lstrip('{')
+                members[-1] = members[-1].rstrip('}')
+                properties.append(_intern(frozenset(members), interned))
+            opened = None
+        elif end == '>':
+            if opened != '<' or i - first != 1 or item != 'm>':
+                errors.append((positions[i], 'Invalid ordered set'))
+            else:
+                properties.append(_intern((items[first].lstrip('<'), 'm'), interned))
+            opened = None
+        elif opened is None:
+            properties.append(_intern(item, interned))
+
+    if opened is not None:
+        errors.append((positions[first], 'Unclosed bracket'))
+    return frozenset(properties), errors
+
+def scan(lines):
+    '''Scans the lines of an input, yielding a (kind, linenum, value) tuple for each line that is
+    not blank: ('head', linenum, Head), ('prominence', linenum, list of entries), or for each
+    syntax error, ('error', linenum, ParseIssue). Head lines with errors yield nothing else. As
+    only the last prominence order is used, an empty entry in it is reported once every line has
+    been scanned, and empty entries in earlier prominence orders are not errors.
+    '''
 
-        return Head(self._name, frozenset(self._final_properties))
+    interned = {}
+    prominence_error = None # for the empty entry in the last prominence order, if any
+    for linenum, raw in enumerate(lines, 1):
+        line = raw.replace(' ', '').strip()
+        if not line:
+            continue
+        if line.startswith('prominence='):
+            entries = line[11:].split(',')
+            prominence_error = None
+            if '' in entries:
+                index = 11 + sum(len(p) + 1 for p in entries[:entries.index('')])
+                prominence_error = ParseIssue(linenum, _column(raw, index),
+                                              'Zero length feature in prominence order')
+            yield 'prominence', linenum, [sys.intern(p) for p in entries]
+            continue
+
+        name, separator, props = line.partition(':')
+        if not (name and separator):
+            yield 'error', linenum, ParseIssue(linenum, _column(raw, 0), 'Invalid syntax')
+            continue
+        if _REGULAR.fullmatch(props):
+            properties = _regular_properties(props, interned)
+        else:
+            properties, errors = _itemwise_properties(props, len(name) + 1, interned)
+            if errors:
+                for index, message in errors:
+                    yield 'error', linenum, ParseIssue(linenum, _column(raw, index), message)
+                continue
+        yield 'head', linenum, Head(sys.intern(name), properties)
+    if prominence_error is not None:
+        yield 'error', prominence_error.line, prominence_error
 
 def parse_file(input_file):
     '''Takes a correctly formatted input file and returns a parsed prominence order and list of
     Head objects.
     '''
 
+    with open(input_file, encoding='utf-8') as f:
+        return parse_lines(f)
+
+def parse_text(text):
+    '''Takes the correctly formatted contents of an input file as a str, and returns a parsed
+    prominence order and list of Head objects.
+    '''
+
+    return parse_lines(text.splitlines())
+
+def parse_lines(lines):
+    '''Takes an iterable of the lines of a correctly formatted input, and returns a parsed
+    prominence order and list of Head objects. Raises a ParserError listing every syntax error if
+    there are any.
+    '''
+
     prominence = []
     heads = []
-    with open(input_file, encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            line = line.replace(' ', '').strip()
-            if line.startswith("prominence="):
-                prominence = line[11:].split(',')
-            elif line != '':
-                heads.append(ParseHead(i+1, line).parse())
+    errors = []
+    for kind, linenum, value in scan(lines):
+        if kind == 'head':
+            heads.append(value)
+        elif kind == 'prominence':
+            prominence = value
+        else:
+            errors.append(value)
+    if errors:
+        errors.sort() # the prominence order's error is found last, whatever its line
+        raise ParserError('\n'.join(str(error) for error in errors), errors)
     if not heads:
         raise ParserError("No heads found")
     if not prominence:
         raise ParserError("No prominence order found")
-    if '' in prominence:
-        raise ParserError("Zero length feature in prominence order")
     return prominence, heads
@@ -0,0 +1,63 @@
+'''Per-phase timing of ALPAFA runs. A Profiler replaces the methods of a single Lexicon that carry
+out each phase of the algorithm with timed wrappers, recording the number of calls to each and the
+time spent in them (the learn phase includes the time of the phases it calls). Nothing is wrapped
+unless profiling is asked for, so unprofiled runs pay nothing for it.
+'''
+
+import collections
+import time
+
+# phase name -> Lexicon method carrying it out, in the order they are reported
+PHASES = collections.OrderedDict([('learn', '_learn'),
+                                  ('headswith', 'headswith'),
+                                  ('coextensive', '_coextensive'),
+                                  ('smallest', '_smallest'),
+                                  ('divide', '_divide'),
+                                  ('rerank', '_rerank'),
+                                  ('display', 'render')])
+
+class Profiler():
+    '''Records the number of calls and cumulative time of each phase of the algorithm.'''
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.times = collections.Counter()
+
+    def wrap(self, phase, method):
+        '''Returns a version of method that adds its calls and time to phase.'''
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.times[phase] += time.perf_counter() - start
+                self.calls[phase] += 1
+
+        return timed
+
+    def attach(self, lex):
+        '''Replaces lex's phase methods with timed versions, on lex alone.'''
+
+        for phase, name in PHASES.items():
+            setattr(lex, name, self.wrap(phase, getattr(type(lex), name).__get__(lex)))
+
+    def phases(self):
+        '''Returns a dict from each phase to a dict of its calls and total time in seconds.'''
+
+        return collections.OrderedDict((phase, {'calls': self.calls[phase],
+                                                'time': self.times[phase]})
+                                       for phase in PHASES)
+
+def format_profile(profile):
+    '''Returns a readable table of a profile returned by Lexicon.profile.'''
+
+    lines = ['{:<12}{:>10}{:>12}'.format('phase', 'calls', 'time (s)')]
+    for phase, figures in profile['phases'].items():
+        lines.append('{:<12}{:>10}{:>12.4f}'.format(phase, figures['calls'], figures['time']))
+    entries = profile['prominence']
+    lines.append('')
+    lines.append('prominence entries: {} initial, {} appended ({} {{p}} sets, {} categories)'
+                 .format(entries['initial'], entries['sets'] + entries['categories'],
+                         entries['sets'], entries['categories']))
+    return '\n'.join(lines)
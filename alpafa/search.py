@@ -0,0 +1,210 @@
+'''Searches the permutations of an input's prominence order for those giving the most economical
+lexicons, by any of the figures reported by Lexicon.counts (the number of categories, for
+instance). Every one of these figures only grows as learning proceeds, so the figure reached after
+learning a prefix of an order is a lower bound on its final value for every order sharing that
+prefix, and a branch can be pruned as soon as its bound exceeds the k-th best final value found so
+far.
+
+Orders are explored depth first, as in sweep.py, by a working Lexicon that takes a checkpoint at
+each branch and restores it for each alternative. The tree of prefixes is split into subtrees,
+which are searched by a pool of worker processes. Each worker shares the k-th best value it has
+found with the others, as a bound that all of them prune by. Every order whose value is no worse
+than the final k-th best is always learned in full, so the results do not depend on how the work
+was divided, though the number of nodes explored may vary from run to run.
+'''
+
+import bisect
+import concurrent.futures
+import multiprocessing
+from .alpafa import Lexicon
+
+OBJECTIVES = ('categories', 'categorial_features', 'non_categorial_features', 'non_vacuous',
+              'loops')
+
+# set in each worker process by _start_worker
+_worker = {}
+
+def _start_worker(grammar, free, pool, options, bound):
+    '''Sets up a worker process (or the main process, if there is no pool) to search subtrees.
+
+    :param free: positions of the entries of grammar.prominence being permuted
+    :param pool: index in grammar.prominence of the entry at each free position (equal entries
+                 share the index of the first)
+    :param options: dict of the objective, number of results, uf_choice and c_select_choice
+    :param bound: multiprocessing.Value shared by every worker, holding the lowest k-th best value
+                  found by any of them
+    '''
+
+    _worker.update(grammar=grammar, free=free, pool=pool, bound=bound, **options)
+
+def _value(lex, objective):
+    '''Returns the value of objective reached by lex so far, which is a lower bound on its final
+    value. The loops of a paused lexicon include the prominence entries still queued, all of which
+    will be looped over.
+    '''
+
+    counts = lex.counts()
+    if objective == 'loops':
+        return counts['loops'] + counts['queued']
+    return counts[objective]
+
+def _publish(value):
+    '''Lowers the shared bound to value, if it is lower.'''
+
+    bound = _worker['bound']
+    with bound.get_lock():
+        if value < bound.value:
+            bound.value = value
+
+def _search_subtree(prefix):
+    '''Searches the orders beginning with prefix, a tuple of indices into the initial prominence
+    order of the entries placed at the first len(prefix) free positions. Returns a sorted list of
+    the best (value, order) pairs found, where order is a tuple of such indices for every free
+    position, along with the number of nodes explored and the number pruned.
+    '''
+
+    grammar, free = _worker['grammar'], _worker['free']
+    objective, top = _worker['objective'], _worker['top']
+    initial = grammar.prominence
+    best = []
+    nodes = pruned = 0
+    lex = Lexicon(grammar, uf_choice=_worker['uf_choice'],
+                  c_select_choice=_worker['c_select_choice'], log_choice=False, learn=False)
+
+    def place(depth, index):
+        '''Places the entry at index in the initial order at free position depth, and learns up to
+        the next free position (or to the end, after the last).
+        '''
+
+        position = free[depth]
+        lex.prominence[position] = lex.initial_prominence[position] = initial[index]
+        lex.resume(free[depth + 1] if depth + 1 < len(free) else None)
+
+    def limit():
+        '''Returns the value above which branches are pruned.'''
+
+        local = best[-1][0] if len(best) == top else float('inf')
+        return min(local, _worker['bound'].value)
+
+    def walk(order, remaining):
+        '''Searches the orders beginning with order, which lex has already learned up to the next
+        free position, using the entries at the indices in remaining for the rest.
+        '''
+
+        nonlocal nodes, pruned
+        if not remaining:
+            bisect.insort(best, (_value(lex, objective), order))
+            if len(best) > top:
+                best.pop()
+            if len(best) == top:
+                _publish(best[-1][0])
+            return
+        checkpoint = lex.checkpoint() if len(set(remaining)) > 1 else None
+        for n, index in enumerate(remaining):
+            if index in remaining[:n]: # equal entries give the same orders
+                continue
+            if n > 0:
+                lex.restore(checkpoint)
+            place(len(order), index)
+            nodes += 1
+            if _value(lex, objective) > limit():
+                pruned += 1
+                continue
+            walk(order + (index,), remaining[:n] + remaining[n + 1:])
+
+    remaining = list(_worker['pool'])
+    lex.resume(free[0])
+    for depth, index in enumerate(prefix):
+        place(depth, index)
+        remaining.remove(index)
+    nodes += len(prefix)
+    if _value(lex, objective) <= limit():
+        walk(prefix, tuple(remaining))
+    else:
+        pruned += 1
+    return best, nodes, pruned
+
+def _prefixes(pool, depth):
+    '''Returns every distinct arrangement of depth entries from pool, a tuple of indices in which
+    equal entries share an index, as tuples in order of first appearance.
+    '''
+
+    if depth == 0:
+        return [()]
+    prefixes = []
+    for n, index in enumerate(pool):
+        if index in pool[:n]:
+            continue
+        rest = pool[:n] + pool[n + 1:]
+        prefixes.extend((index,) + prefix for prefix in _prefixes(rest, depth - 1))
+    return prefixes
+
+def search(grammar, entries=None, objective='categories', top=5, workers=None, uf_choice=True,
+           c_select_choice=True):
+    '''Searches the permutations of grammar's prominence order for the top orders with the lowest
+    value of objective (one of OBJECTIVES). Returns a dict of 'results', a list of up to top dicts
+    of each order's 'value' and 'prominence' (best first, ties in the order the permutations
+    would be listed in), and the numbers of 'nodes' (prefixes learned) and 'pruned' (prefixes
+    abandoned).
+
+    :param grammar: a Grammar
+    :param entries: entries of the prominence order to permute, leaving the rest in place (all of
+                    them if None)
+    :param workers: number of worker processes (all available CPUs if None, and no pool if 1)
+    '''
+
+    if objective not in OBJECTIVES:
+        raise ValueError('unknown objective: {}'.format(objective))
+    if top < 1:
+        raise ValueError('top must be at least 1')
+    initial = grammar.prominence
+    if entries is None:
+        free = tuple(range(len(initial)))
+    else:
+        missing = [entry for entry in entries if entry not in initial]
+        if missing:
+            raise ValueError('not in the prominence order: {}'.format(', '.join(missing)))
+        free = tuple(i for i, entry in enumerate(initial) if entry in entries)
+    if not free:
+        raise ValueError('no prominence entries to permute')
+
+    # split the tree into enough subtrees to keep every worker busy
+    pool = tuple(initial.index(initial[p]) for p in free) # equal entries share an index
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    depth = 0
+    prefixes = [()]
+    while depth < len(free) - 1 and len(prefixes) < 8 * workers and workers > 1:
+        depth += 1
+        prefixes = _prefixes(pool, depth)
+
+    options = {'objective': objective, 'top': top, 'uf_choice': uf_choice,
+               'c_select_choice': c_select_choice}
+    bound = multiprocessing.Value('d', float('inf'))
+    if workers == 1:
+        _start_worker(grammar, free, pool, options, bound)
+        outcomes = map(_search_subtree, prefixes)
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_start_worker,
+            initargs=(grammar, free, pool, options, bound))
+        outcomes = executor.map(_search_subtree, prefixes)
+    try:
+        best = []
+        nodes = pruned = 0
+        for found, explored, abandoned in outcomes:
+            best = sorted(best + found)[:top]
+            nodes += explored
+            pruned += abandoned
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    results = []
+    for value, order in best:
+        prominence = list(initial)
+        for position, index in zip(free, order):
+            prominence[position] = initial[index]
+        results.append({'value': value, 'prominence': prominence})
+    return {'results': results, 'nodes': nodes, 'pruned': pruned}
@@ -0,0 +1,260 @@
+'''A long-running ALPAFA server, which saves tools that run ALPAFA many times from paying for Python
+startup, imports and parsing on every run. Requests and responses are JSON objects, one per line,
+read from stdin and written to stdout, or exchanged over connections to a Unix domain socket. An
+asyncio front end reads requests and writes responses, while the work of parsing, learning and
+rendering is done by a pool of worker processes, each of which keeps its recently parsed grammars.
+
+Each request gives either "grammar", the text of an input file, or "file", the path of an input file
+or compiled lexicon, along with any of the options "uf", "cselect" (both true by default), "log",
+"categories", "dependents" (all false by default) and "format" (one of formats.FORMATS, "text" by
+default), and optionally an "id", which is copied to the response. A successful response gives the
+statistics of the run as "stats", and the output as a string in "output", or for the json format as
+an object in "result". A failed request gets a response with an "error" message instead.
+Responses are written as their requests complete, which need not be in the order they were made.
+'''
+
+import asyncio
+import concurrent.futures
+import functools
+import io
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import sys
+from .alpafa import Grammar
+from .cache import ResultCache, cached_lexicon
+from .compiled import load_input
+from .formats import FORMATS, write_output
+from .parse import ParserError, parse_text
+
+OPTIONS = {'uf': True, 'cselect': True, 'log': False, 'categories': False, 'dependents': False,
+           'format': 'text'}
+
+class RequestError(Exception):
+    '''For requests that cannot be carried out.'''
+    pass
+
+class ServerError(Exception):
+    '''For servers that cannot be started.'''
+    pass
+
+@functools.lru_cache(maxsize=32)
+def _file_grammar(path, mtime, size):
+    '''Returns the Grammar of an input file, which is reloaded if its modification time or size
+    has changed.
+    '''
+
+    return Grammar(*load_input(path))
+
+@functools.lru_cache(maxsize=32)
+def _text_grammar(text):
+    '''Returns the Grammar of the text of an input file.'''
+
+    return Grammar(*parse_text(text))
+
+def load_grammar(request):
+    '''Returns the Grammar given by a request, from this process's recently parsed grammars if
+    possible.
+    '''
+
+    if 'grammar' in request:
+        if not isinstance(request['grammar'], str):
+            raise RequestError('grammar must be a string')
+        return _text_grammar(request['grammar'])
+    if 'file' in request:
+        path = os.path.abspath(request['file'])
+        try:
+            info = os.stat(path)
+        except OSError as e:
+            raise RequestError('input failure: {}'.format(e.strerror))
+        return _file_grammar(path, info.st_mtime_ns, info.st_size)
+    raise RequestError('request has neither grammar nor file')
+
+def handle(request, cache_dir=None):
+    '''Carries out a request (a dict, see the module docstring), and returns the response dict.
+    Run in the worker processes.
+
+    :param cache_dir: directory of the result cache (no caching if None)
+    '''
+
+    response = {'id': request.get('id')}
+    try:
+        options = dict(OPTIONS)
+        for name, value in request.items():
+            if name in OPTIONS:
+                if name != 'format' and not isinstance(value, bool):
+                    raise RequestError('{} must be true or false'.format(name))
+                options[name] = value
+            elif name not in ('id', 'grammar', 'file'):
+                raise RequestError('unknown request field: {}'.format(name))
+        if not isinstance(options['format'], str) or options['format'] not in FORMATS:
+            raise RequestError('unknown output format: {}'.format(options['format']))
+        if options['dependents']:
+            options['categories'] = True
+        try:
+            grammar = load_grammar(request)
+        except ParserError as e:
+            raise RequestError('parsing failure: {}'.format(e))
+        cache = ResultCache(cache_dir) if cache_dir is not None else None
+        lex = cached_lexicon(grammar, None, options['uf'], options['cselect'], options['log'],
+                             cache)
+        output = io.StringIO()
+        write_output(lex, output, options['format'], options['log'], options['categories'],
+                     options['dependents'])
+    except RequestError as e:
+        response['error'] = str(e)
+        return response
+    response['stats'] = lex.counts()
+    if options['format'] == 'json':
+        response['result'] = json.loads(output.getvalue())
+    else:
+        response['output'] = output.getvalue()
+    return response
+
+def _listening(path):
+    '''Returns True if a server accepts connections on the Unix domain socket at path.'''
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError: # refused by a socket no server is listening on
+            return False
+    return True
+
+class _StdinReader():
+    '''Reads lines from stdin in a thread, so that stdin can be a file or terminal as well as a
+    pipe.
+    '''
+
+    async def readline(self):
+        '''Returns the next line of stdin as bytes, or b'' at the end.'''
+
+        return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.readline)
+
+class Server():
+    '''Reads requests from streams, passes them to a pool of worker processes, and writes the
+    responses back.
+    '''
+
+    def __init__(self, workers=None, cache_dir=None):
+        ''':param workers: number of worker processes (all available CPUs if None)
+           :param cache_dir: directory of the result cache (no caching if None)
+        '''
+
+        # workers are started as needed; spawned rather than forked, so that they do not inherit
+        # (and hold open) the connections being served when they start
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.cache_dir = cache_dir
+
+    async def respond(self, line):
+        '''Returns the response to a request line, as a line of JSON.'''
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+        except ValueError as e:
+            response = {'id': None, 'error': 'invalid request: {}'.format(e)}
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(self.pool, handle, request, self.cache_dir)
+            except Exception as e: # keep serving whatever goes wrong with one request
+                response = {'id': request.get('id'),
+                            'error': 'internal failure: {}: {}'.format(type(e).__name__, e)}
+        return json.dumps(response, ensure_ascii=False) + '\n'
+
+    async def serve_stream(self, reader, write):
+        '''Answers each request line read from reader, passing each response line to write, until
+        reader is exhausted and every request has been answered.
+
+        :param write: coroutine function taking a response line
+        '''
+
+        async def answer(line):
+            '''Writes the response to a single request line.'''
+
+            await write(await self.respond(line))
+
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_stdio(self):
+        '''Answers requests from stdin on stdout, until stdin is closed.'''
+
+        async def write(line):
+            '''Writes a response line to stdout.'''
+
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+        await self.serve_stream(_StdinReader(), write)
+
+    async def serve_socket(self, path):
+        '''Answers requests from each connection to a Unix domain socket at path, until
+        interrupted or terminated.
+        '''
+
+        async def connection(reader, writer):
+            '''Answers the requests from a single connection.'''
+
+            async def write(line):
+                '''Writes a response line to the connection.'''
+
+                writer.write(line.encode('utf-8'))
+                await writer.drain()
+
+            try:
+                await self.serve_stream(reader, write)
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ServerError('{} exists and is not a socket'.format(path))
+            if _listening(path):
+                raise ServerError('another server is already listening on {}'.format(path))
+            os.unlink(path) # left behind by an earlier server that did not shut down cleanly
+        server = await asyncio.start_unix_server(connection, path, limit=2**26)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def close(self):
+        '''Shuts down the worker processes.'''
+
+        self.pool.shutdown()
+
+def serve(socket_path=None, workers=None, cache_dir=None):
+    '''Runs a server on stdin and stdout, or on a Unix domain socket at socket_path if given.'''
+
+    server = Server(workers, cache_dir)
+    try:
+        if socket_path is None:
+            asyncio.run(server.serve_stdio())
+        else:
+            asyncio.run(server.serve_socket(socket_path))
+    finally:
+        server.close()
@@ -0,0 +1,57 @@
+'''Runs ALPAFA over many prominence orders for the same heads, sharing work between orders with a
+common prefix. The orders are arranged in a prefix trie, and a single working Lexicon walks the
+trie depth first, taking a checkpoint wherever the trie branches and restoring it for each branch,
+so every shared prefix is only learned once.
+'''
+
+from .alpafa import Lexicon
+
+def _build_trie(orders):
+    '''Returns a prefix trie of orders, in which each node is a dict from prominence entry to child
+    node, and the None key of a leaf holds the indices of the orders ending there.
+    '''
+
+    trie = {}
+    for i, order in enumerate(orders):
+        node = trie
+        for p in order:
+            node = node.setdefault(p, {})
+        node.setdefault(None, []).append(i)
+    return trie
+
+def sweep(orders, heads, uf_choice=True, c_select_choice=True, log_choice=True):
+    '''Applies ALPAFA to heads under each of a list of prominence orders of equal length, and
+    returns a list of the resulting Lexicons, in the same order. Each result is identical to a
+    Lexicon built independently from the same order.
+    '''
+
+    orders = [list(order) for order in orders]
+    if not orders:
+        return []
+    if any(len(order) != len(orders[0]) for order in orders):
+        raise ValueError('prominence orders must all be the same length')
+
+    results = [None] * len(orders)
+    lex = Lexicon(list(orders[0]), heads, uf_choice, c_select_choice, log_choice, learn=False)
+
+    def walk(node, depth):
+        '''Learns each order below node, whose prefix of length depth lex has already learned.'''
+
+        if None in node:
+            lex.resume()
+            for i in node[None]:
+                results[i] = lex.copy()
+                results[i].grammar = lex.grammar.with_prominence(orders[i])
+            return
+        branches = list(node.items())
+        checkpoint = lex.checkpoint() if len(branches) > 1 else None
+        for n, (p, child) in enumerate(branches):
+            if n > 0:
+                lex.restore(checkpoint)
+            lex.prominence[depth] = p
+            lex.initial_prominence[depth] = p
+            lex.resume(depth + 1)
+            walk(child, depth + 1)
+
+    walk(_build_trie(orders), 0)
+    return results
@@ -5,8 +5,9 @@ setup(
     version='0.2',
     packages=find_packages(),
     entry_points={'console_scripts': ['alpafa=alpafa.cli:main']},
+    extras_require={'numpy': ['numpy']},
     platforms='any',
-    python_requires='>=3',
+    python_requires='>=3.7',
     author='Timothy Bazalgette',
     author_email='timothy.bazalgette@gmail.com',
     description='Algorithm for lexicocentric parameter acquisition by feature assignment',
@@ -21,9 +22,11 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6'
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12'
     ]
 )
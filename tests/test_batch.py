@@ -0,0 +1,34 @@
+'''Tests for the naming of batch jobs' output files.'''
+
+import os
+import unittest
+from alpafa.batch import make_jobs
+
+class OutputNameTest(unittest.TestCase):
+
+    def outputs(self, input_files, **options):
+        '''Returns the output file names of the jobs for input_files, in job order.'''
+
+        jobs = make_jobs(input_files, 'out', options.get('uf', [True]),
+                         options.get('cselect', [True]), False, False, False)
+        return [os.path.basename(job['output']) for job in jobs]
+
+    def test_plain(self):
+        self.assertEqual(self.outputs(['a/x.txt', 'a/y.alpc'], uf=[True, False]),
+                         ['x.txt', 'x.no_uf.txt', 'y.txt', 'y.no_uf.txt'])
+
+    def test_shared_stem(self):
+        self.assertEqual(self.outputs(['a/x.txt', 'a/x.alpc', 'a/y.txt']),
+                         ['x.txt.txt', 'x.alpc.txt', 'y.txt'])
+
+    def test_shared_name(self):
+        self.assertEqual(self.outputs(['a/x.txt', 'b/x.txt', 'a/x.txt']),
+                         ['x.txt.1.txt', 'x.txt.2.txt', 'x.txt.3.txt'])
+
+    def test_unique(self):
+        inputs = ['a/x.txt', 'b/x.txt', 'x.alpc', 'x.txt.1.txt', 'c/x.txt.1.txt']
+        outputs = self.outputs(inputs, uf=[True, False], cselect=[True, False])
+        self.assertEqual(len(set(outputs)), len(outputs))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+'''Tests for the result cache's keys and its handling of unusable cached results.'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from alpafa import cache
+from alpafa.alpafa import Grammar
+from alpafa.parse import parse_text
+
+GRAMMAR = Grammar(*parse_text('A: x, y\nB: x\nC: y\nprominence = x, y\n'))
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = cache.ResultCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        lex = cache.cached_lexicon(GRAMMAR, cache=self.cache)
+        cached = self.cache.get(cache.cache_key(GRAMMAR))
+        self.assertEqual(cached.display(True, True, True), lex.display(True, True, True))
+
+    def test_format_in_key(self):
+        key = cache.cache_key(GRAMMAR)
+        with mock.patch.object(cache, 'CACHE_FORMAT', cache.CACHE_FORMAT + 1):
+            self.assertNotEqual(cache.cache_key(GRAMMAR), key)
+
+    def test_unusable_results(self):
+        key = cache.cache_key(GRAMMAR)
+        for data in (b'', b'not a pickle', b'\x80\x04\x95garbage',
+                     b'\x80\x04cno_such_module\nX\n.'):
+            with open(os.path.join(self.directory, key + '.pickle'), 'wb') as f:
+                f.write(data)
+            with self.subTest(data=data):
+                self.assertIsNone(self.cache.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+'''Round-trip tests for compiled lexicons: compiling an input and loading it must give exactly what
+parse.parse_file gives for the text, and damaged files must be rejected with a ParserError.
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from alpafa.bench.generate import generate
+from alpafa.compiled import compile_file, load_compiled, load_input
+from alpafa.parse import ParserError, parse_file
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+def described(prominence, heads):
+    '''Returns a parsed input as comparable values (Head objects compare by identity).'''
+
+    return prominence, [(head.name, head.properties) for head in heads]
+
+class CompiledTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def compile(self, input_file):
+        '''Compiles input_file into the test directory, returning the compiled file's name.'''
+
+        output_file = os.path.join(self.directory, os.path.basename(input_file) + '.alpc')
+        compile_file(input_file, output_file)
+        return output_file
+
+    def generated(self, seed, **params):
+        '''Writes a synthetic input to the test directory, returning its name.'''
+
+        input_file = os.path.join(self.directory, 'g{}.txt'.format(seed))
+        with open(input_file, 'w', encoding='utf-8') as f:
+            f.write(generate(seed=seed, **params))
+        return input_file
+
+    def assertRoundTrip(self, input_file):
+        '''Checks that the compiled form of input_file loads as parse_file parses the text.'''
+
+        expected = described(*parse_file(input_file))
+        compiled = self.compile(input_file)
+        self.assertEqual(described(*load_compiled(compiled)), expected)
+        self.assertEqual(described(*load_input(compiled)), expected)
+
+    def test_examples(self):
+        for name in sorted(os.listdir(EXAMPLES)):
+            with self.subTest(name=name):
+                self.assertRoundTrip(os.path.join(EXAMPLES, name))
+
+    def test_generated(self):
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                self.assertRoundTrip(self.generated(seed, heads=5 + 10 * seed,
+                                                    properties=1 + seed % 12,
+                                                    set_properties=seed % 7,
+                                                    movement_properties=seed % 4))
+
+    def test_truncated(self):
+        compiled = self.compile(self.generated(0, heads=8, properties=4))
+        with open(compiled, 'rb') as f:
+            data = f.read()
+        for length in range(len(data)):
+            truncated = os.path.join(self.directory, 'truncated.alpc')
+            with open(truncated, 'wb') as f:
+                f.write(data[:length])
+            with self.subTest(length=length):
+                with self.assertRaises(ParserError):
+                    load_compiled(truncated)
+
+    def test_trailing_data(self):
+        compiled = self.compile(os.path.join(EXAMPLES, 'english.txt'))
+        with open(compiled, 'ab') as f:
+            f.write(b'\0\0\0\0')
+        with self.assertRaises(ParserError):
+            load_compiled(compiled)
+
+    def test_invalid_strings(self):
+        compiled = self.compile(os.path.join(EXAMPLES, 'english.txt'))
+        with open(compiled, 'rb') as f:
+            data = bytearray(f.read())
+        start = data.index('Cmat'.encode('utf-8'))
+        data[start] = 0xff
+        with open(compiled, 'wb') as f:
+            f.write(data)
+        with self.assertRaises(ParserError):
+            load_compiled(compiled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+'''Differential tests for the alternative engines: each must learn exactly the same lexicons as the
+reference engine, on the examples and on seeded synthetic inputs.
+'''
+
+import os
+import unittest
+from alpafa.alpafa import Grammar
+from alpafa.bench.differential import check_grammar, synthetic_grammars
+from alpafa.parse import parse_file
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+@unittest.skipUnless(numpy, 'the numpy engine requires numpy')
+class EnginesTest(unittest.TestCase):
+
+    def test_examples(self):
+        for name in sorted(os.listdir(EXAMPLES)):
+            with self.subTest(name=name):
+                grammar = Grammar(*parse_file(os.path.join(EXAMPLES, name)))
+                self.assertEqual(check_grammar(grammar), [])
+
+    def test_synthetic(self):
+        for seed in range(3):
+            for name, grammar in synthetic_grammars(10, seed):
+                with self.subTest(seed=seed, name=name):
+                    self.assertEqual(check_grammar(grammar), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+'''Tests for incremental learning: updating or extending a Lexicon with an edited grammar must give
+exactly what a new Lexicon learned from the edited grammar gives.
+'''
+
+import os
+import unittest
+from alpafa.alpafa import Grammar, HeadSpec, Lexicon
+from alpafa.bench.differential import OPTIONS, synthetic_grammars
+from alpafa.parse import parse_file
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+def toggled(grammar):
+    '''Returns grammar with the first head's last prominence property added or removed.'''
+
+    prop = grammar.prominence[-1]
+    heads = list(grammar.heads)
+    heads[0] = HeadSpec(heads[0].name, heads[0].properties ^ {prop})
+    return Grammar(grammar.prominence, heads)
+
+def reordered(grammar):
+    '''Returns grammar with the last two entries of its prominence order swapped.'''
+
+    prominence = list(grammar.prominence)
+    prominence[-2:] = prominence[-1:-3:-1]
+    return grammar.with_prominence(prominence)
+
+def with_head(grammar):
+    '''Returns grammar with an extra head bearing the first two prominence properties.'''
+
+    head = HeadSpec('Extra', frozenset(grammar.prominence[:2]))
+    return Grammar(grammar.prominence, grammar.heads + (head,))
+
+EDITS = (toggled, reordered, with_head)
+
+class IncrementalTest(unittest.TestCase):
+
+    def grammars(self):
+        '''Yields a name and Grammar for each input to test, all with at least two prominence
+        entries.
+        '''
+
+        for name in ('english.txt', 'nepali.txt'):
+            yield name, Grammar(*parse_file(os.path.join(EXAMPLES, name)))
+        for name, grammar in synthetic_grammars(8, seed=3):
+            if len(grammar.prominence) >= 2:
+                yield name, grammar
+
+    def assertLearned(self, lex, grammar, uf, cselect):
+        '''Checks that lex gives the same output as a new Lexicon learned from grammar.'''
+
+        expected = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect)
+        self.assertEqual(lex.grammar, grammar)
+        self.assertEqual(lex.display(True, True, True), expected.display(True, True, True))
+
+    def test_update(self):
+        for name, grammar in self.grammars():
+            for uf, cselect in OPTIONS:
+                for edit in EDITS:
+                    with self.subTest(name=name, uf=uf, cselect=cselect, edit=edit.__name__):
+                        lex = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect,
+                                      incremental_choice=True)
+                        edited = edit(grammar)
+                        lex.update(edited)
+                        self.assertLearned(lex, edited, uf, cselect)
+                        lex.update(grammar) # and back again
+                        self.assertLearned(lex, grammar, uf, cselect)
+
+    def test_successive_updates(self):
+        for name, grammar in self.grammars():
+            for uf, cselect in OPTIONS:
+                with self.subTest(name=name, uf=uf, cselect=cselect):
+                    lex = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect,
+                                  incremental_choice=True)
+                    for edit in EDITS:
+                        grammar = edit(grammar)
+                        lex.update(grammar)
+                        self.assertLearned(lex, grammar, uf, cselect)
+
+    def test_extend(self):
+        for name, grammar in self.grammars():
+            shortened = grammar.with_prominence(grammar.prominence[:-1])
+            for uf, cselect in OPTIONS:
+                with self.subTest(name=name, uf=uf, cselect=cselect):
+                    lex = Lexicon(shortened, uf_choice=uf, c_select_choice=cselect,
+                                  incremental_choice=True)
+                    lex.extend(grammar.prominence[-1:])
+                    self.assertLearned(lex, grammar, uf, cselect)
+
+if __name__ == '__main__':
+    unittest.main()
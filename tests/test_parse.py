@@ -0,0 +1,51 @@
+'''Tests for the parser's error reporting: every syntax error in an input is reported at once, at
+its line and column, and only the last prominence order is checked.
+'''
+
+import unittest
+from alpafa.parse import ParseIssue, ParserError, parse_text
+
+class ParseErrorTest(unittest.TestCase):
+
+    def errors(self, text):
+        '''Returns the errors reported for text, which must not parse.'''
+
+        with self.assertRaises(ParserError) as raised:
+            parse_text(text)
+        return raised.exception.errors
+
+    def test_every_error(self):
+        text = 'A: x\nB x\nC: y}, z\n  D : <a, b>\nprominence = x, , y\nE: {x, {y}}\n'
+        self.assertEqual(self.errors(text),
+                         [ParseIssue(2, 1, 'Invalid syntax'),
+                          ParseIssue(3, 4, 'Invalid set'),
+                          ParseIssue(4, 11, 'Invalid ordered set'),
+                          ParseIssue(5, 17, 'Zero length feature in prominence order'),
+                          ParseIssue(6, 8, 'Set inside set')])
+
+    def test_message(self):
+        with self.assertRaises(ParserError) as raised:
+            parse_text('A: x\nB x\nprominence = x\n')
+        self.assertEqual(str(raised.exception), 'Invalid syntax on line 2, column 1 of input')
+
+    def test_unclosed_bracket(self):
+        self.assertEqual(self.errors('A: x, {y, z\nprominence = x\n'),
+                         [ParseIssue(1, 7, 'Unclosed bracket')])
+        self.assertEqual(self.errors('A: <x, m\nprominence = x\n'),
+                         [ParseIssue(1, 4, 'Unclosed bracket')])
+
+    def test_empty_prominence_entry(self):
+        self.assertEqual(self.errors('A: x\nprominence = x,\n'),
+                         [ParseIssue(2, 16, 'Zero length feature in prominence order')])
+        self.assertEqual(self.errors('A: x\nprominence =\n'),
+                         [ParseIssue(2, 13, 'Zero length feature in prominence order')])
+
+    def test_overridden_prominence(self):
+        prominence, heads = parse_text('prominence = x,,y\nA: x\nprominence = x, y\n')
+        self.assertEqual(prominence, ['x', 'y'])
+        self.assertEqual([head.name for head in heads], ['A'])
+        self.assertEqual(self.errors('A: x\nprominence = x, y\nprominence = , y\n'),
+                         [ParseIssue(3, 14, 'Zero length feature in prominence order')])
+
+if __name__ == '__main__':
+    unittest.main()
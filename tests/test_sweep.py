@@ -0,0 +1,104 @@
+'''Tests for sweeps over prominence orders, and the checkpoints they rely on: every result must be
+identical to a Lexicon learned independently from its order.
+'''
+
+import itertools
+import os
+import random
+import unittest
+from alpafa.alpafa import Grammar, Lexicon
+from alpafa.bench.differential import OPTIONS, synthetic_grammars
+from alpafa.parse import parse_file
+from alpafa.sweep import sweep
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+def shuffled_orders(prominence, count, seed):
+    '''Returns count random reorderings of prominence, keeping a random prefix of each (so that
+    they share prefixes), followed by a repeat of the first order.
+    '''
+
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(count):
+        keep = rng.randint(0, len(prominence))
+        rest = list(prominence[keep:])
+        rng.shuffle(rest)
+        orders.append(list(prominence[:keep]) + rest)
+    return orders + orders[:1]
+
+class SweepTest(unittest.TestCase):
+
+    def grammars(self):
+        '''Yields a name and Grammar for each input to test.'''
+
+        yield 'english.txt', Grammar(*parse_file(os.path.join(EXAMPLES, 'english.txt')))
+        yield from synthetic_grammars(6, seed=7)
+
+    def assertIndependent(self, lex, grammar, uf, cselect):
+        '''Checks that lex gives the same output as a new Lexicon learned from grammar.'''
+
+        expected = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect)
+        self.assertEqual(lex.display(True, True, True), expected.display(True, True, True))
+
+    def test_sweep(self):
+        for name, grammar in self.grammars():
+            orders = shuffled_orders(grammar.prominence, 4, seed=len(grammar.heads))
+            for uf, cselect in OPTIONS:
+                with self.subTest(name=name, uf=uf, cselect=cselect):
+                    results = sweep(orders, grammar.heads, uf, cselect)
+                    self.assertEqual(len(results), len(orders))
+                    for order, lex in zip(orders, results):
+                        self.assertEqual(lex.grammar, grammar.with_prominence(order))
+                        self.assertIndependent(lex, grammar.with_prominence(order), uf, cselect)
+                    self.assertIsNot(results[0], results[-1])
+
+    def test_all_orders(self):
+        grammar = Grammar(*parse_file(os.path.join(EXAMPLES, 'english.txt')))
+        prominence = list(grammar.prominence)
+        orders = [list(first) + prominence[3:] for first in itertools.permutations(prominence[:3])]
+        orders += orders[::2] # duplicates, out of order
+        for lex, order in zip(sweep(orders, grammar.heads), orders):
+            self.assertEqual(lex.grammar, grammar.with_prominence(order))
+            self.assertIndependent(lex, grammar.with_prominence(order), True, True)
+
+    def test_unequal_lengths(self):
+        grammar = Grammar(*parse_file(os.path.join(EXAMPLES, 'english.txt')))
+        with self.assertRaises(ValueError):
+            sweep([grammar.prominence, grammar.prominence[:-1]], grammar.heads)
+        self.assertEqual(sweep([], grammar.heads), [])
+
+    def test_restore(self):
+        for name, grammar in self.grammars():
+            prominence = list(grammar.prominence)
+            for uf, cselect in OPTIONS:
+                with self.subTest(name=name, uf=uf, cselect=cselect):
+                    lex = Lexicon(grammar, uf_choice=uf, c_select_choice=cselect, learn=False)
+                    lex.resume(len(prominence) // 2)
+                    checkpoint = lex.checkpoint()
+                    lex.resume()
+                    self.assertIndependent(lex, grammar, uf, cselect)
+
+                    lex.restore(checkpoint) # the same order again
+                    lex.resume()
+                    self.assertIndependent(lex, grammar, uf, cselect)
+
+                    position = checkpoint.position
+                    order = prominence[:position] + prominence[position:][::-1]
+                    lex.restore(checkpoint, order)
+                    lex.resume()
+                    self.assertIndependent(lex, grammar.with_prominence(order), uf, cselect)
+
+    def test_restore_mismatch(self):
+        grammar = Grammar(*parse_file(os.path.join(EXAMPLES, 'english.txt')))
+        prominence = list(grammar.prominence)
+        lex = Lexicon(grammar, learn=False)
+        lex.resume(2)
+        checkpoint = lex.checkpoint()
+        with self.assertRaises(ValueError):
+            lex.restore(checkpoint, prominence[1::-1] + prominence[2:])
+        with self.assertRaises(ValueError):
+            lex.restore(checkpoint, prominence[:-1])
+
+if __name__ == '__main__':
+    unittest.main()